@@ -3,13 +3,33 @@ Tolkien Gateway - Complete Infobox Extractor
 Extracts ALL infobox templates with proper RDF generation aligned with schema.org
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
 import os
 import time
-import json
+import sys
+import threading
+import functools
+import multiprocessing
+import sqlite3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from rdflib import Graph, URIRef, Literal, Namespace, RDF, RDFS, XSD
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import mwparserfromhell
+    _PARSE_WIKITEXT = mwparserfromhell.parse
+except ImportError:
+    mwparserfromhell = None
+    _PARSE_WIKITEXT = None
+
 # ---------------------------
 # Configuration
 # ---------------------------
@@ -17,6 +37,23 @@ API_URL = "https://tolkiengateway.net/w/api.php"
 #FUSEKI_ENDPOINT = "http://localhost:3030/tolkienKG/update"  # Changed to /update
 FUSEKI_ENDPOINT = None  # Fuseki disabled
 
+# Shared HTTP session: keep-alive connections are reused across all API calls
+SESSION = requests.Session()
+SESSION.headers.update({"Accept-Encoding": "gzip", "User-Agent": "tolkien-kg/1.0"})
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16,
+                                      max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# Concurrency: worker threads share SESSION, rate limited to ~10 requests/s overall
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 10
+_rate_lock = threading.Lock()
+_next_request_time = 0.0
+
+# On-disk wikitext cache keyed by (title, revision id), reused across runs
+WIKITEXT_CACHE_FILE = "data/wikitext_cache.sqlite"
+_cache_lock = threading.Lock()
+_cache_db = None
+
 # ---------------------------
 # Namespaces
 # ---------------------------
@@ -101,6 +138,41 @@ PROPERTY_MAPPINGS = {
     "outcome": TGWO.outcome,
 }
 
+# Lookup structures built once from PROPERTY_MAPPINGS
+_PROP_EXACT = {k.lower(): v for k, v in PROPERTY_MAPPINGS.items()}
+_PROP_ITEMS = tuple(_PROP_EXACT.items())  # Keeps mapping order for substring matches
+_PROP_DATE_SET = frozenset([SCHEMA.birthDate, SCHEMA.deathDate, SCHEMA.startDate,
+                            SCHEMA.endDate, SCHEMA.datePublished])
+
+
+# ---------------------------
+# Compiled Patterns
+# ---------------------------
+_RE_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_RE_LINK = re.compile(r'\[\[([^\]|]+)(?:\|([^\]]+))?\]\]')
+_RE_LINK_TARGET = re.compile(r'\[\[([^\]|]+)(?:\|[^\]]+)?\]\]')
+_RE_EXTLINK_TEXT = re.compile(r'\[https?://[^\s]+ ([^\]]+)\]')
+_RE_EXTLINK = re.compile(r'\[https?://[^\]]+\]')
+_RE_TEMPLATE = re.compile(r'\{\{[^}]*\}\}')
+_RE_FILE = re.compile(r'\[\[(File|Image|Media):[^\]]+\]\]', re.IGNORECASE)
+_RE_REF = re.compile(r'<ref[^>]*>.*?</ref>', re.DOTALL)
+_RE_REF_SELF = re.compile(r'<ref[^/]*/>')
+_RE_HTML = re.compile(r'<[^>]+>')
+_RE_UND = re.compile(r'_+')
+
+# Common date patterns in Tolkien Gateway, most specific first
+_RE_DATES = tuple(re.compile(pattern) for pattern in (
+    r'(\d{1,2}\s+\w+\s+\d{4})',  # 25 December 3018
+    r'(\w+\s+\d{4})',  # December 3018
+    r'(\d{4})',  # 3018
+    r'(\d{1,2}\s+\w+)',  # 25 December
+))
+
+# Characters replaced by "_" in URI fragments
+_URI_TRANS = str.maketrans({c: "_" for c in ['"', "'", " ", ":", "(", ")", "[", "]", "{", "}",
+                                             "|", "\\", "/", "#", ",", ";", ".", "!", "?", "@",
+                                             "&", "=", "+", "$", "%", "*", "~", "`", "^"]})
+
 
 # ---------------------------
 # Utility Functions
@@ -121,25 +193,23 @@ def safe_uri_name(name):
         safe = safe.split(" (")[0].strip()
 
     # Replace problematic characters
-    for char in ['"', "'", " ", ":", "(", ")", "[", "]", "{", "}",
-                 "|", "\\", "/", "#", ",", ";", ".", "!", "?", "@",
-                 "&", "=", "+", "$", "%", "*", "~", "`", "^"]:
-        safe = safe.replace(char, "_")
+    safe = safe.translate(_URI_TRANS)
 
     # Collapse multiple underscores
-    safe = re.sub(r"_+", "_", safe)
+    safe = _RE_UND.sub("_", safe)
     safe = safe.strip("_")
 
     return safe if safe else "unknown"
 
 
+@functools.lru_cache(maxsize=65536)
 def clean_wikitext_value(value):
-    """Clean wikitext values thoroughly."""
+    """Clean wikitext values thoroughly (memoized: infobox values repeat a lot)."""
     if not value:
         return ""
 
     # Remove HTML comments
-    value = re.sub(r'<!--.*?-->', '', value, flags=re.DOTALL)
+    value = _RE_COMMENT.sub('', value)
 
     # Handle internal links [[Page|Display]] -> Display or Page
     def replace_link(match):
@@ -147,24 +217,24 @@ def clean_wikitext_value(value):
         display = match.group(2).strip() if match.group(2) else page
         return display
 
-    value = re.sub(r'\[\[([^\]|]+)(?:\|([^\]]+))?\]\]', replace_link, value)
+    value = _RE_LINK.sub(replace_link, value)
 
     # Remove external links [URL text] -> text
-    value = re.sub(r'\[https?://[^\s]+ ([^\]]+)\]', r'\1', value)
-    value = re.sub(r'\[https?://[^\]]+\]', '', value)
+    value = _RE_EXTLINK_TEXT.sub(r'\1', value)
+    value = _RE_EXTLINK.sub('', value)
 
     # Remove templates {{...}} but keep the content
-    value = re.sub(r'\{\{[^}]*\}\}', '', value)
+    value = _RE_TEMPLATE.sub('', value)
 
     # Remove file links [[File:...]]
-    value = re.sub(r'\[\[(File|Image|Media):[^\]]+\]\]', '', value, flags=re.IGNORECASE)
+    value = _RE_FILE.sub('', value)
 
     # Remove ref tags <ref>...</ref>
-    value = re.sub(r'<ref[^>]*>.*?</ref>', '', value, flags=re.DOTALL)
-    value = re.sub(r'<ref[^/]*/>', '', value)
+    value = _RE_REF.sub('', value)
+    value = _RE_REF_SELF.sub('', value)
 
     # Remove other HTML tags but keep content
-    value = re.sub(r'<[^>]+>', '', value)
+    value = _RE_HTML.sub('', value)
 
     # Remove leading/trailing quotes and braces
     value = value.strip('"\'{}[]()')
@@ -172,42 +242,109 @@ def clean_wikitext_value(value):
     # Clean whitespace
     value = ' '.join(value.split())
 
-    return value.strip()
+    # Interned so repeated values share one string across Literals
+    return sys.intern(value.strip())
 
 
+@functools.lru_cache(maxsize=65536)
 def extract_links_from_value(value):
-    """Extract page links from wikitext value."""
+    """Extract page links from wikitext value (returned as a tuple, memoized)."""
     links = []
     # Match [[Page]] or [[Page|Display]]
-    matches = re.findall(r'\[\[([^\]|]+)(?:\|[^\]]+)?\]\]', value)
+    matches = _RE_LINK_TARGET.findall(value)
     for match in matches:
         link = clean_wikitext_value(match).strip()
         if link and link not in links:
             links.append(link)
-    return links
+    return tuple(links)
+
+
+@functools.lru_cache(maxsize=None)
+def map_property(prop_name_lower):
+    """Map a lowercase infobox parameter name to a schema.org property (or None)."""
+    mapped_prop = _PROP_EXACT.get(prop_name_lower)
+    if mapped_prop is not None:
+        return mapped_prop
 
+    # Fallback: first mapping whose key contains or is contained in the name
+    for key, value in _PROP_ITEMS:
+        if key in prop_name_lower or prop_name_lower in key:
+            return value
+
+    return None
 
+
+@functools.lru_cache(maxsize=65536)
 def get_date_from_value(value):
     """Try to extract a date from a value."""
-    # Common date patterns in Tolkien Gateway
-    patterns = [
-        r'(\d{1,2}\s+\w+\s+\d{4})',  # 25 December 3018
-        r'(\w+\s+\d{4})',  # December 3018
-        r'(\d{4})',  # 3018
-        r'(\d{1,2}\s+\w+)',  # 25 December
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, value)
+    # Each pattern is tried on the whole value before falling back to the next one
+    for pattern in _RE_DATES:
+        match = pattern.search(value)
         if match:
             return match.group(1)
 
     return None
 
 
+# ---------------------------
+# Wikitext Cache
+# ---------------------------
+def _get_cache_db():
+    """Open the wikitext cache database on first use."""
+    global _cache_db
+
+    if _cache_db is None:
+        os.makedirs(os.path.dirname(WIKITEXT_CACHE_FILE), exist_ok=True)
+        _cache_db = sqlite3.connect(WIKITEXT_CACHE_FILE, check_same_thread=False)
+        _cache_db.execute(
+            "CREATE TABLE IF NOT EXISTS wikitext ("
+            "title TEXT, rev_id INTEGER, content TEXT, PRIMARY KEY (title, rev_id))"
+        )
+    return _cache_db
+
+
+def cache_get(title, rev_id):
+    """Return cached wikitext for this revision of a page, or None."""
+    with _cache_lock:
+        row = _get_cache_db().execute(
+            "SELECT content FROM wikitext WHERE title = ? AND rev_id = ?", (title, rev_id)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def cache_put_many(rows):
+    """Store (title, rev_id, wikitext) rows in the cache."""
+    if not rows:
+        return
+    with _cache_lock:
+        db = _get_cache_db()
+        db.executemany("INSERT OR REPLACE INTO wikitext VALUES (?, ?, ?)", rows)
+        db.commit()
+
+
 # ---------------------------
 # MediaWiki API Functions
 # ---------------------------
+def parse_json(response):
+    """Decode an API response body (orjson when installed, else stdlib json)."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def wait_for_rate_limit():
+    """Block until the next API request slot is free (shared by all threads)."""
+    global _next_request_time
+
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_time - now
+        _next_request_time = max(now, _next_request_time) + 1.0 / REQUESTS_PER_SECOND
+
+    if wait > 0:
+        time.sleep(wait)
+
+
 def get_all_infobox_templates():
     """Get ALL templates from Category:Infobox templates."""
     print("Fetching all infobox templates from Category:Infobox templates...")
@@ -228,13 +365,14 @@ def get_all_infobox_templates():
             if continue_param:
                 params["cmcontinue"] = continue_param
 
-            response = requests.get(API_URL, params=params, timeout=30)
+            wait_for_rate_limit()
+            response = SESSION.get(API_URL, params=params, timeout=30)
 
             if response.status_code != 200:
                 print(f"Error fetching templates: HTTP {response.status_code}")
                 break
 
-            data = response.json()
+            data = parse_json(response)
 
             if "query" in data:
                 members = data["query"]["categorymembers"]
@@ -248,7 +386,6 @@ def get_all_infobox_templates():
             # Check if there are more pages
             if "continue" in data and "cmcontinue" in data["continue"]:
                 continue_param = data["continue"]["cmcontinue"]
-                time.sleep(0.5)  # Be polite to the API
             else:
                 break
 
@@ -277,33 +414,53 @@ def get_all_infobox_templates():
     return filtered_templates
 
 
-def test_template_has_pages(template_name, test_limit=3):
-    """Test if a template actually has pages that use it."""
+def get_templates_with_pages(templates):
+    """Return which of up to 50 templates are transcluded in at least one article."""
+    working = set()
+    if not templates:
+        return working
+
+    params = {
+        "action": "query",
+        "prop": "transcludedin",
+        "titles": "|".join(templates[:50]),
+        "tinamespace": "0",
+        "tiprop": "pageid",
+        "tilimit": "max",
+        "format": "json",
+    }
+
     try:
-        params = {
-            "action": "query",
-            "generator": "embeddedin",
-            "geititle": template_name,
-            "geilimit": str(test_limit),
-            "geinamespace": "0",
-            "prop": "info",
-            "format": "json",
-        }
+        while True:
+            wait_for_rate_limit()
+            response = SESSION.get(API_URL, params=params, timeout=30)
+            if response.status_code != 200:
+                break
 
-        response = requests.get(API_URL, params=params, timeout=15)
-        if response.status_code != 200:
-            return False
+            data = parse_json(response)
 
-        data = response.json()
-        return "query" in data and "pages" in data["query"] and len(data["query"]["pages"]) > 0
+            if "query" in data and "pages" in data["query"]:
+                for page_id, page_info in data["query"]["pages"].items():
+                    if page_info.get("transcludedin"):
+                        working.add(page_info["title"])
 
-    except Exception:
-        return False
+            # tilimit is shared by the whole batch, so follow ticontinue
+            if "continue" in data:
+                params.update(data["continue"])
+            else:
+                break
+
+    except Exception as e:
+        print(f"    Error testing template batch: {e}")
+
+    return working
 
 
 def get_pages_for_template(template_name, limit=100):
-    """Get pages using a template with pagination."""
-    pages = []
+    """Get pages using a template with pagination, as {title: latest revision id}."""
+    # Listing revision ids rather than contents costs a second request per 50
+    # uncached pages, but lets unchanged pages come from the local cache
+    pages = {}
     continue_param = None
 
     print(f"  Searching: {template_name}")
@@ -323,17 +480,18 @@ def get_pages_for_template(template_name, limit=100):
             if continue_param:
                 params["geicontinue"] = continue_param
 
-            response = requests.get(API_URL, params=params, timeout=30)
+            wait_for_rate_limit()
+            response = SESSION.get(API_URL, params=params, timeout=30)
             if response.status_code != 200:
                 break
 
-            data = response.json()
+            data = parse_json(response)
 
             if "query" in data:
                 batch_pages = data["query"]["pages"]
                 for page_id, page_info in batch_pages.items():
                     if "missing" not in page_info:
-                        pages.append(page_info["title"])
+                        pages[page_info["title"]] = page_info.get("lastrevid")
 
                 if len(pages) % 50 == 0:
                     print(f"    Found {len(pages)} pages so far...")
@@ -341,7 +499,6 @@ def get_pages_for_template(template_name, limit=100):
             # Check for more pages
             if "continue" in data and "geicontinue" in data["continue"]:
                 continue_param = data["continue"]["geicontinue"]
-                time.sleep(0.3)
             else:
                 break
 
@@ -352,192 +509,281 @@ def get_pages_for_template(template_name, limit=100):
         print(f"    Error: {e}")
 
     print(f"    Total found: {len(pages)} pages")
-    return pages[:limit]
+    return dict(list(pages.items())[:limit])
 
 
-def get_page_content(page_title):
-    """Get page content with wikitext."""
+def get_pages_content_batch(titles):
+    """Get wikitext for up to 50 pages in a single API request (and cache it)."""
+    contents = {}
+    if not titles:
+        return contents
+
     try:
         params = {
-            "action": "parse",
-            "page": page_title,
-            "prop": "wikitext",
+            "action": "query",
+            "prop": "revisions",
+            "rvprop": "content|ids",
+            "rvslots": "main",
+            "titles": "|".join(titles[:50]),
             "format": "json",
         }
 
-        response = requests.get(API_URL, params=params, timeout=15)
+        wait_for_rate_limit()
+        response = SESSION.get(API_URL, params=params, timeout=30)
         if response.status_code != 200:
-            return ""
-
-        data = response.json()
-        if "parse" in data and "wikitext" in data["parse"]:
-            return data["parse"]["wikitext"]["*"]
+            return contents
+
+        data = parse_json(response)
+        rows = []
+        if "query" in data and "pages" in data["query"]:
+            for page_id, page_info in data["query"]["pages"].items():
+                if "missing" in page_info or "revisions" not in page_info:
+                    continue
+                revision = page_info["revisions"][0]
+                wikitext = revision["slots"]["main"].get("*", "")
+                if wikitext:
+                    contents[page_info["title"]] = wikitext
+                    rows.append((page_info["title"], revision["revid"], wikitext))
+        cache_put_many(rows)
 
     except Exception as e:
-        print(f"    Error getting content for {page_title}: {e}")
+        print(f"    Error getting content for batch of {len(titles[:50])} pages: {e}")
+
+    return contents
 
-    return ""
+
+def get_template_items(template_name, rev_ids):
+    """(title, template, wikitext) of a template's pages, fetched 50 at a time."""
+    items = []
+    rev_ids = list(rev_ids.items())
+    for i in range(0, len(rev_ids), 50):
+        contents = get_cached_pages_content(dict(rev_ids[i:i + 50]))
+        items.extend((title, template_name, wikitext) for title, wikitext in contents.items())
+    return items
+
+
+def get_cached_pages_content(rev_ids):
+    """Get wikitext for {title: rev_id}, downloading only pages missing from the cache."""
+    contents = {}
+    missing = []
+
+    for title, rev_id in rev_ids.items():
+        wikitext = cache_get(title, rev_id)
+        if wikitext is None:
+            missing.append(title)
+        else:
+            contents[title] = wikitext
+
+    if missing:
+        contents.update(get_pages_content_batch(missing))
+
+    return contents
 
 
 # ---------------------------
 # Template Extraction with mwparserfromhell
 # ---------------------------
+@functools.lru_cache(maxsize=None)
+def _template_targets(template_name):
+    """Lowercase name variants accepted for a template (with/without "infobox ")."""
+    template_short = template_name.replace("Template:", "").lower()
+    return frozenset({template_short, template_short.replace("infobox ", "")})
+
+
 def extract_template_with_mwparser(wikitext, template_name):
     """Extract template using mwparserfromhell."""
-    try:
-        import mwparserfromhell
-
-        wikicode = mwparserfromhell.parse(wikitext)
-        template_short = template_name.replace("Template:", "")
-
-        # Chercher toutes les occurrences du template
-        for template in wikicode.filter_templates():
-            current_name = str(template.name).strip()
-
-            # Comparaison flexible des noms de template
-            comparison_names = [
-                current_name.lower(),
-                current_name.lower().replace("infobox ", ""),
-                template_short.lower(),
-                template_short.lower().replace("infobox ", ""),
-            ]
-
-            # Vérifier si c'est le bon template
-            is_target = any(
-                name in comparison_names for name in [
-                    template_short.lower(),
-                    template_short.lower().replace("infobox ", "")
-                ]
-            ) or any(
-                template_short.lower() in name for name in comparison_names
-            )
-
-            if is_target:
-                properties = {}
-
-                # Extraire tous les paramètres
-                for param in template.params:
-                    param_name = str(param.name).strip()
-                    param_value = str(param.value).strip()
-
-                    if param_name and param_value:
-                        # Ignorer les paramètres numérotés (ex: |1=, |2=)
-                        if not param_name.isdigit():
-                            clean_name = clean_wikitext_value(param_name)
-                            clean_value = clean_wikitext_value(param_value)
-
-                            if clean_name and clean_value:
-                                properties[clean_name] = clean_value
-
-                return properties
-
-    except ImportError:
-        print("    WARNING: mwparserfromhell not installed, using regex fallback")
+    if mwparserfromhell is None:
         return extract_template_simple_fallback(wikitext, template_name)
+
+    try:
+        wikicode = _PARSE_WIKITEXT(wikitext)
+        targets = _template_targets(template_name)
+
+        # Comparaison flexible des noms de template, faite par le filtre
+        def is_target(node):
+            current_name = str(node.name).strip().lower()
+            return any(target in current_name for target in targets)
+
+        # Seules les occurrences du bon template sont parcourues
+        for template in wikicode.filter_templates(matches=is_target):
+            properties = {}
+
+            # Extraire tous les paramètres
+            for param in template.params:
+                param_name = str(param.name).strip()
+                param_value = str(param.value).strip()
+
+                if param_name and param_value:
+                    # Ignorer les paramètres numérotés (ex: |1=, |2=)
+                    if not param_name.isdigit():
+                        clean_name = clean_wikitext_value(param_name)
+                        clean_value = clean_wikitext_value(param_value)
+
+                        if clean_name and clean_value:
+                            properties[clean_name] = clean_value
+
+            return properties
+
     except Exception as e:
         print(f"    Parser error: {e}")
 
     return {}
 
 
+def split_template_params(wikitext, template_name):
+    """Find the first {{template_name|...}} and return its (key, value) parameters.
+
+    Walks the wikitext once tracking {{ }} and [[ ]] nesting, so nested templates
+    and piped links inside values do not split parameters.
+    """
+    target = template_name.replace("Template:", "").strip().lower()
+    length = len(wikitext)
+    depth = 0
+    link_depth = 0
+    start = 0
+    pipes = []
+
+    i = 0
+    while i < length:
+        char = wikitext[i]
+        next_char = wikitext[i + 1] if i + 1 < length else ""
+
+        if char == "{" and next_char == "{":
+            depth += 1
+            if depth == 1:
+                start = i + 2
+                pipes = []
+                link_depth = 0
+            i += 2
+            continue
+
+        if char == "}" and next_char == "}" and depth > 0:
+            if depth == 1:
+                bounds = [start] + [p + 1 for p in pipes]
+                ends = pipes + [i]
+                segments = [wikitext[b:e] for b, e in zip(bounds, ends)]
+
+                if segments[0].strip().lower() == target:
+                    params = []
+                    for segment in segments[1:]:
+                        if "=" in segment:
+                            key, value = segment.split("=", 1)
+                            params.append((key.strip(), value.strip()))
+                    return params
+            depth -= 1
+            i += 2
+            continue
+
+        if depth >= 1:
+            if char == "[" and next_char == "[":
+                link_depth += 1
+                i += 2
+                continue
+            if char == "]" and next_char == "]" and link_depth > 0:
+                link_depth -= 1
+                i += 2
+                continue
+            if char == "|" and depth == 1 and link_depth == 0:
+                pipes.append(i)
+
+        i += 1
+
+    return []
+
+
 def extract_template_simple_fallback(wikitext, template_name):
     """Fallback extraction if mwparserfromhell is not available."""
-    template_short = template_name.replace("Template:", "")
+    properties = {}
 
-    # Try to find the template
-    patterns = [
-        rf'\{{{{\s*{re.escape(template_short)}\s*\|([^{{}}]+(?:\{{{{[^{{}}]*?\}}}}\s*)*[^{{}}]*?)}}}}',
-        rf'\{{{{\s*{re.escape(template_short.lower())}\s*\|([^{{}}]+(?:\{{{{[^{{}}]*?\}}}}\s*)*[^{{}}]*?)}}}}',
-    ]
+    for key, value in split_template_params(wikitext, template_name):
+        if key and value:
+            clean_key = clean_wikitext_value(key)
+            clean_value = clean_wikitext_value(value)
+            if clean_key and clean_value:
+                properties[clean_key] = clean_value
 
-    for pattern in patterns:
-        matches = re.findall(pattern, wikitext, re.IGNORECASE | re.DOTALL)
-        if matches:
-            template_content = matches[0]
+    return properties
 
-            # Parse parameters
-            properties = {}
-            lines = template_content.split('\n')
-
-            for line in lines:
-                line = line.strip()
-                if line.startswith('|') and '=' in line:
-                    line = line[1:]  # Remove leading |
-                    parts = line.split('=', 1)
-                    if len(parts) == 2:
-                        key = parts[0].strip()
-                        value = parts[1].strip()
-
-                        if key and value:
-                            clean_key = clean_wikitext_value(key)
-                            clean_value = clean_wikitext_value(value)
-                            if clean_key and clean_value:
-                                properties[clean_key] = clean_value
-
-            return properties
 
-    return {}
+def _extract_worker(item):
+    """Pool worker: parse one page's wikitext into template properties."""
+    page_title, template_name, wikitext = item
+    return page_title, template_name, extract_template_with_mwparser(wikitext, template_name)
 
 
 # ---------------------------
 # Categorization and RDF Generation
 # ---------------------------
+# Keywords checked in order of specificity: the first match decides the category
+_CATEGORY_KEYWORDS = tuple(
+    (keyword, category)
+    for category, keywords in [
+        ("Character", ['character', 'person', 'elf', 'dwarf', 'hobbit',
+                       'orc', 'troll', 'valar', 'maiar', 'wizard', 'king']),
+        ("Location", ['location', 'place', 'city', 'country', 'kingdom',
+                      'realm', 'region', 'forest', 'mountain', 'river']),
+        ("Book", ['book', 'novel', 'publication']),
+        ("Film", ['film', 'movie', 'video']),
+        ("Event", ['event', 'battle', 'war', 'campaign', 'feast']),
+        ("Organization", ['organization', 'company', 'society', 'guild']),
+        ("Race", ['race', 'species', 'people', 'culture']),
+        ("Item", ['item', 'object', 'artifact', 'weapon', 'ring']),
+        ("Media", ['media', 'audio', 'song', 'music', 'album']),
+    ]
+    for keyword in keywords
+)
+
+
+@functools.lru_cache(maxsize=None)
 def categorize_template(template_name):
     """Categorize template based on its name."""
     template_lower = template_name.lower()
 
-    # Check in order of specificity
-    if any(x in template_lower for x in ['character', 'person', 'elf', 'dwarf', 'hobbit',
-                                         'orc', 'troll', 'valar', 'maiar', 'wizard', 'king']):
-        return "Character"
-    elif any(x in template_lower for x in ['location', 'place', 'city', 'country', 'kingdom',
-                                           'realm', 'region', 'forest', 'mountain', 'river']):
-        return "Location"
-    elif any(x in template_lower for x in ['book', 'novel', 'publication']):
-        return "Book"
-    elif any(x in template_lower for x in ['film', 'movie', 'video']):
-        return "Film"
-    elif any(x in template_lower for x in ['event', 'battle', 'war', 'campaign', 'feast']):
-        return "Event"
-    elif any(x in template_lower for x in ['organization', 'company', 'society', 'guild']):
-        return "Organization"
-    elif any(x in template_lower for x in ['race', 'species', 'people', 'culture']):
-        return "Race"
-    elif any(x in template_lower for x in ['item', 'object', 'artifact', 'weapon', 'ring']):
-        return "Item"
-    elif any(x in template_lower for x in ['media', 'audio', 'song', 'music', 'album']):
-        return "Media"
-    else:
-        return "Other"
+    for keyword, category in _CATEGORY_KEYWORDS:
+        if keyword in template_lower:
+            return category
+
+    return "Other"
 
 
-def add_to_graph(graph, page_title, template_name, properties):
-    """Add data to RDF graph with schema.org alignment."""
+def add_to_graph(graph, page_title, template_name, properties, seen_edges=None):
+    """Add data to RDF graph with schema.org alignment.
+
+    seen_edges holds the relatedTo edges already emitted by the caller's run,
+    one (smaller URI, larger URI) pair per edge; without it, edges are only
+    deduplicated within the page.
+    """
     if not properties:
         return False
 
+    if seen_edges is None:
+        seen_edges = set()
+
     try:
         # Create URIs
         page_uri = URIRef(TGW[safe_uri_name(page_title)])
         page_url = f"https://tolkiengateway.net/wiki/{page_title.replace(' ', '_')}"
 
+        # All triples of the page are collected, then added with one addN call
+        triples = []
+
         # Add basic info
-        graph.add((page_uri, RDF.type, SCHEMA.Thing))
-        graph.add((page_uri, SCHEMA.name, Literal(page_title)))
-        graph.add((page_uri, SCHEMA.url, Literal(page_url, datatype=XSD.anyURI)))
-        graph.add((page_uri, DCTERMS.source, Literal("Tolkien Gateway")))
+        triples.append((page_uri, RDF.type, SCHEMA.Thing, graph))
+        triples.append((page_uri, SCHEMA.name, Literal(page_title), graph))
+        triples.append((page_uri, SCHEMA.url, Literal(page_url, datatype=XSD.anyURI), graph))
+        triples.append((page_uri, DCTERMS.source, Literal("Tolkien Gateway"), graph))
 
         # Add template info
         template_clean = template_name.replace("Template:", "")
-        graph.add((page_uri, TGWO.usesTemplate, Literal(template_clean)))
+        triples.append((page_uri, TGWO.usesTemplate, Literal(template_clean), graph))
 
         # Add type based on template category
         category = categorize_template(template_name)
         schema_class = CATEGORY_TO_SCHEMA.get(category, SCHEMA.Thing)
-        graph.add((page_uri, RDF.type, schema_class))
+        triples.append((page_uri, RDF.type, schema_class, graph))
 
         # Also add custom category property
-        graph.add((page_uri, TGWO.category, Literal(category)))
+        triples.append((page_uri, TGWO.category, Literal(category), graph))
 
         # Process properties
         for prop_name, prop_value in properties.items():
@@ -548,38 +794,39 @@ def add_to_graph(graph, page_title, template_name, properties):
             prop_name_lower = prop_name.lower().strip()
 
             # Try to map to schema.org
-            mapped_prop = None
-            for key, value in PROPERTY_MAPPINGS.items():
-                if key in prop_name_lower or prop_name_lower in key:
-                    mapped_prop = value
-                    break
+            mapped_prop = map_property(prop_name_lower)
 
             if mapped_prop:
                 # Special handling for dates
-                if mapped_prop in [SCHEMA.birthDate, SCHEMA.deathDate, SCHEMA.startDate,
-                                   SCHEMA.endDate, SCHEMA.datePublished]:
+                if mapped_prop in _PROP_DATE_SET:
                     date_value = get_date_from_value(prop_value)
                     if date_value:
-                        graph.add((page_uri, mapped_prop, Literal(date_value)))
+                        triples.append((page_uri, mapped_prop, Literal(date_value), graph))
                     else:
-                        graph.add((page_uri, mapped_prop, Literal(prop_value)))
+                        triples.append((page_uri, mapped_prop, Literal(prop_value), graph))
                 else:
-                    graph.add((page_uri, mapped_prop, Literal(prop_value)))
+                    triples.append((page_uri, mapped_prop, Literal(prop_value), graph))
             else:
                 # Fallback: use custom ontology
                 safe_prop = safe_uri_name(prop_name)
-                graph.add((page_uri, TGWO[safe_prop], Literal(prop_value)))
+                triples.append((page_uri, TGWO[safe_prop], Literal(prop_value), graph))
 
-        # Extract and add links to other pages
-        all_values = list(properties.values())
-        for prop_value in all_values:
-            links = extract_links_from_value(prop_value)
-            for link in links:
+        # Extract and add links to other pages (each edge only once per run)
+        for prop_value in properties.values():
+            for link in extract_links_from_value(prop_value):
                 if link and link != page_title:
                     link_uri = URIRef(TGW[safe_uri_name(link)])
+                    edge = (page_uri, link_uri) if page_uri < link_uri else (link_uri, page_uri)
+                    if edge in seen_edges:
+                        continue
+                    seen_edges.add(edge)
+
                     # Add bidirectional relationship
-                    graph.add((page_uri, SCHEMA.relatedTo, link_uri))
-                    graph.add((link_uri, SCHEMA.relatedTo, page_uri))
+                    triples.append((page_uri, SCHEMA.relatedTo, link_uri, graph))
+                    triples.append((link_uri, SCHEMA.relatedTo, page_uri, graph))
+
+        # A page can repeat a triple (schema:Thing as its category class, two fields with the same value)
+        graph.addN(dict.fromkeys(triples))
 
         return True
 
@@ -589,28 +836,83 @@ def add_to_graph(graph, page_title, template_name, properties):
 
 
 # ---------------------------
-# Save and Export Functions
+# Streaming N-Triples Writer
 # ---------------------------
-def save_graph(graph, filename):
-    """Save graph to Turtle file."""
-    try:
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-
-        # Serialize to Turtle
-        graph.serialize(filename, format="turtle")
-        file_size = os.path.getsize(filename) / 1024
+_NT_ESCAPE = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def nt_term(term):
+    """Format an rdflib term for N-Triples output."""
+    if isinstance(term, Literal):
+        lexical = str(term).translate(_NT_ESCAPE)
+        if term.language:
+            return f'"{lexical}"@{term.language}'
+        if term.datatype:
+            return f'"{lexical}"^^<{term.datatype}>'
+        return f'"{lexical}"'
+    return term.n3()
+
+
+class TripleWriter:
+    """Write triples straight to an N-Triples file instead of an in-memory Graph.
+
+    Exposes add()/addN() like rdflib.Graph so add_to_graph() can use either.
+    Unlike a Graph it keeps no triples: duplicates are only dropped for the
+    subjects passed to share_subjects().
+    """
+
+    def __init__(self, filename, buffer_size=1 << 20):
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self.count = 0
+        self._file = open(filename, "wb", buffering=buffer_size)
+        self._shared = frozenset()
+        self._shared_lines = set()
+
+    def share_subjects(self, subjects):
+        """Drop repeated triples of these subjects (URIs that several pages map to)."""
+        self._shared = frozenset(subjects)
+
+    def add(self, triple):
+        s, p, o = triple
+        line = f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n"
+        if s in self._shared:
+            if line in self._shared_lines:
+                return
+            self._shared_lines.add(line)
+        self._file.write(line.encode("utf-8"))
+        self.count += 1
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.add((s, p, o))
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __len__(self):
+        return self.count
+
+
+def load_nt_graph(filename):
+    """Load an N-Triples file back into a Graph with the usual prefixes bound."""
+    graph = Graph()
+    graph.parse(filename, format="nt")
 
-        print(f"\n✓ Saved: {filename}")
-        print(f"  Size: {file_size:.1f} KB")
-        print(f"  Triples: {len(graph)}")
+    graph.bind("schema", SCHEMA)
+    graph.bind("tgw", TGW)
+    graph.bind("tgwo", TGWO)
+    graph.bind("dcterms", DCTERMS)
+    graph.bind("foaf", FOAF)
+    graph.bind("rdfs", RDFS)
+    graph.bind("xsd", XSD)
 
-        return True
-    except Exception as e:
-        print(f"✗ Error saving graph: {e}")
-        return False
+    return graph
 
 
+# ---------------------------
+# Save and Export Functions
+# ---------------------------
 def send_to_fuseki(graph, endpoint):
     """Send graph to Fuseki triplestore."""
 
@@ -626,7 +928,7 @@ def send_to_fuseki(graph, endpoint):
             "Content-Type": "application/x-turtle"
         }
 
-        response = requests.post(
+        response = SESSION.post(
             endpoint,
             data=ttl_data,
             headers=headers,
@@ -652,6 +954,8 @@ def save_by_category(graph, base_dir="data/categories"):
 
     print("\nSaving data by category...")
 
+    category_graphs = {}
+    class_to_categories = {}
     for category, schema_class in CATEGORY_TO_SCHEMA.items():
         category_graph = Graph()
 
@@ -660,16 +964,21 @@ def save_by_category(graph, base_dir="data/categories"):
         category_graph.bind("tgw", TGW)
         category_graph.bind("tgwo", TGWO)
 
-        # Find all entities of this category
-        entities = set()
-        for s, p, o in graph.triples((None, RDF.type, schema_class)):
-            entities.add(s)
+        category_graphs[category] = category_graph
+        class_to_categories.setdefault(schema_class, []).append(category)
+
+    # Find the categories of every entity in one pass over rdf:type
+    subj_to_categories = {}
+    for s, p, o in graph.triples((None, RDF.type, None)):
+        for category in class_to_categories.get(o, ()):
+            subj_to_categories.setdefault(s, set()).add(category)
 
-        # Add all triples for these entities
-        for entity in entities:
-            for s, p, o in graph.triples((entity, None, None)):
-                category_graph.add((s, p, o))
+    # Route each triple to the graphs of its subject's categories
+    for s, p, o in graph:
+        for category in subj_to_categories.get(s, ()):
+            category_graphs[category].add((s, p, o))
 
+    for category, category_graph in category_graphs.items():
         if len(category_graph) > 0:
             filename = os.path.join(base_dir, f"{category.lower()}.ttl")
             category_graph.serialize(filename, format="turtle")
@@ -687,13 +996,12 @@ def main():
     print("=" * 70)
 
     # Check for mwparserfromhell
-    try:
-        import mwparserfromhell
+    if mwparserfromhell is not None:
         print("✓ mwparserfromhell is available")
-    except ImportError:
+    else:
         print("⚠️  WARNING: mwparserfromhell not installed")
         print("   Install with: pip install mwparserfromhell")
-        print("   Using regex fallback (less accurate)")
+        print("   Using brace-scanner fallback (less accurate)")
 
     # Step 1: Get ALL infobox templates
     print("\n[1/4] Fetching infobox templates...")
@@ -708,18 +1016,21 @@ def main():
     working_templates = []
     failed_templates = []
 
+    # 50 templates per request instead of one request per template
+    batches = [all_templates[i:i + 50] for i in range(0, len(all_templates), 50)]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        templates_with_pages = set().union(*executor.map(get_templates_with_pages, batches))
+
     for i, template in enumerate(all_templates, 1):
         print(f"[{i}/{len(all_templates)}] Testing: {template}")
 
-        if test_template_has_pages(template):
+        if template in templates_with_pages:
             working_templates.append(template)
             print(f"  ✓ Has pages")
         else:
             failed_templates.append(template)
             print(f"  ✗ No pages found")
 
-        time.sleep(0.2)
-
     print(f"\nTemplate summary:")
     print(f"  Working templates: {len(working_templates)}")
     print(f"  Empty templates: {len(failed_templates)}")
@@ -749,25 +1060,20 @@ def main():
         if len(templates) > 5:
             print(f"  ... and {len(templates) - 5} more")
 
-    # Step 3: Initialize RDF graph
-    print("\n[3/4] Initializing RDF graph...")
-    graph = Graph()
+    # Step 3: Initialize RDF output (triples are streamed to N-Triples)
+    print("\n[3/4] Initializing RDF output...")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = "data"
+    main_filename = f"{output_dir}/tolkien_graph_{timestamp}.nt"
+    writer = TripleWriter(main_filename)
 
-    # Bind namespaces
-    graph.bind("schema", SCHEMA)
-    graph.bind("tgw", TGW)
-    graph.bind("tgwo", TGWO)
-    graph.bind("dcterms", DCTERMS)
-    graph.bind("foaf", FOAF)
-    graph.bind("rdfs", RDFS)
-    graph.bind("xsd", XSD)
-
-    # Add ontology declarations
+    # Add ontology declarations (several categories share a schema.org class)
+    for schema_class in dict.fromkeys(CATEGORY_TO_SCHEMA.values()):
+        writer.add((schema_class, RDFS.subClassOf, SCHEMA.Thing))
     for category, schema_class in CATEGORY_TO_SCHEMA.items():
-        graph.add((schema_class, RDFS.subClassOf, SCHEMA.Thing))
-        graph.add((schema_class, RDFS.label, Literal(f"{category}")))
-        graph.add((schema_class, RDFS.comment,
-                   Literal(f"A {category.lower()} from Tolkien's legendarium")))
+        writer.add((schema_class, RDFS.label, Literal(f"{category}")))
+        writer.add((schema_class, RDFS.comment,
+                    Literal(f"A {category.lower()} from Tolkien's legendarium")))
 
     # Step 4: Process templates and extract data
     print("\n[4/4] Extracting data from pages...")
@@ -776,56 +1082,80 @@ def main():
     start_time = time.time()
     total_pages = 0
     total_successful = 0
-    processed_pages = set()  # To avoid duplicates
-
-    # Process each working template
-    for template_idx, template_name in enumerate(working_templates, 1):
-        category = categorize_template(template_name)
 
-        print(f"\n[{template_idx}/{len(working_templates)}] {template_name}")
-        print(f"  Category: {category}")
+    # List every template's pages first (concurrently), then keep each page
+    # only under the first template that uses it
+    print("Listing pages for all templates...")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        listed = executor.map(lambda t: get_pages_for_template(t, limit=50),  # Limit for testing
+                              working_templates)
+
+        seen = set()
+        pages_by_template = {}
+        for template_name, pages in zip(working_templates, listed):
+            pages_by_template[template_name] = {
+                title: rev_id for title, rev_id in pages.items()
+                if not (title in seen or seen.add(title))
+            }
+    unique_pages = len(seen)
+    del seen
 
-        # Get pages for this template
-        pages = get_pages_for_template(template_name, limit=50)  # Limit for testing
+    # Different titles can reduce to the same URI: only those subjects need deduplicating
+    uri_counts = Counter(safe_uri_name(title) for pages in pages_by_template.values() for title in pages)
+    writer.share_subjects(URIRef(TGW[name]) for name, count in uri_counts.items() if count > 1)
 
-        if not pages:
-            print(f"    No pages found (skipping)")
-            continue
+    # relatedTo edges written so far (both directions are written at once)
+    seen_edges = set()
 
-        print(f"    Processing {len(pages)} pages...")
+    # Contents are fetched in threads, a few templates ahead of the one being parsed
+    fetcher = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    content_jobs = {}
 
-        template_success = 0
+    def fetch_ahead(idx):
+        if idx < len(working_templates):
+            template_name = working_templates[idx]
+            content_jobs[template_name] = fetcher.submit(
+                get_template_items, template_name, pages_by_template[template_name])
 
-        for page_idx, page_title in enumerate(pages, 1):
-            # Skip if already processed
-            if page_title in processed_pages:
-                continue
+    for idx in range(MAX_WORKERS):
+        fetch_ahead(idx)
 
-            processed_pages.add(page_title)
+    # Parsing is CPU-bound: run it in worker processes, the writer stays here
+    try:
+        with multiprocessing.Pool(os.cpu_count()) as pool:
+            # Process each working template
+            for template_idx, template_name in enumerate(working_templates, 1):
+                fetch_ahead(template_idx - 1 + MAX_WORKERS)
+                category = categorize_template(template_name)
 
-            if page_idx % 10 == 0 or page_idx == 1 or page_idx == len(pages):
-                print(f"      Page {page_idx}/{len(pages)}: {page_title[:40]}...")
+                print(f"\n[{template_idx}/{len(working_templates)}] {template_name}")
+                print(f"  Category: {category}")
 
-            # Get page content
-            wikitext = get_page_content(page_title)
-            if not wikitext:
-                continue
+                template_success = 0
+                rev_ids = pages_by_template.pop(template_name)
+                items = content_jobs.pop(template_name).result()
 
-            total_pages += 1
+                if not rev_ids:
+                    print(f"    No new pages found (skipping)")
+                    continue
 
-            # Extract template data
-            properties = extract_template_with_mwparser(wikitext, template_name)
+                print(f"    Processing {len(rev_ids)} pages...")
 
-            if properties:
-                if add_to_graph(graph, page_title, template_name, properties):
-                    total_successful += 1
-                    template_success += 1
+                total_pages += len(items)
 
-            # Be polite to the API
-            time.sleep(0.1)
+                # Extract template data
+                for page_title, _, properties in pool.imap_unordered(_extract_worker, items, chunksize=32):
+                    if properties:
+                        if add_to_graph(writer, page_title, template_name, properties, seen_edges):
+                            total_successful += 1
+                            template_success += 1
 
-        print(f"    {template_success}/{len(pages)} successful extractions")
+                print(f"    {template_success}/{len(rev_ids)} successful extractions")
+    finally:
+        # Fetches not started yet are dropped if the extraction stops early
+        fetcher.shutdown(cancel_futures=True)
 
+    writer.close()
     elapsed = time.time() - start_time
 
     # Summary
@@ -837,19 +1167,19 @@ def main():
     print(f"  Total templates found: {len(all_templates)}")
     print(f"  Working templates processed: {len(working_templates)}")
     print(f"  Empty templates skipped: {len(failed_templates)}")
-    print(f"  Unique pages processed: {len(processed_pages)}")
+    print(f"  Unique pages processed: {unique_pages}")
     print(f"  Successful extractions: {total_successful}")
-    print(f"  RDF triples generated: {len(graph)}")
+    print(f"  RDF triples generated: {len(writer)}")
     print(f"  Time elapsed: {elapsed:.1f}s ({elapsed / 60:.1f}min)")
 
     # Save results
-    if len(graph) > 0:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = "data"
-
-        # Main graph
-        main_filename = f"{output_dir}/tolkien_graph_{timestamp}.ttl"
-        save_graph(graph, main_filename)
+    if len(writer) > 0:
+        # Main graph was written during extraction; load it once for the splits
+        graph = load_nt_graph(main_filename)
+        file_size = os.path.getsize(main_filename) / 1024
+        print(f"\n✓ Saved: {main_filename}")
+        print(f"  Size: {file_size:.1f} KB")
+        print(f"  Triples: {len(graph)}")
 
         # By category
         save_by_category(graph, f"{output_dir}/categories")
@@ -1,143 +1,466 @@
 """
 Debug the exact structure of cards.json
 """
+import io
 import json
+import mmap
 import os
+import pickle
+import re
+import sys
+from collections import Counter
+from functools import reduce
+from itertools import islice
+from operator import getitem
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# DEBUG_VERBOSE=0: only headings and totals, no per-item detail
+VERBOSE = os.environ.get("DEBUG_VERBOSE", "1") == "1"
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CARDS_FILE = os.path.join(PROJECT_ROOT, "data", "cards.json")
+CARDS_CACHE = CARDS_FILE + ".pkl"
+LARGE_LIST_THRESHOLD = 100
 
+# Indentation strings, indexed by level
+PREFIXES = tuple("  " * i for i in range(16))
 
-def debug_structure(data, indent=0, max_depth=3, current_depth=0):
-    """Recursively debug JSON structure."""
-    if current_depth >= max_depth:
-        return
+# Raw JSON tokens for the byte-level scan
+_RE_TOKEN = re.compile(rb'[\[\]{},"]')
+_RE_STRING = re.compile(rb'"((?:[^"\\]|\\.)*)"', re.S)
+_RE_FLAT_ARRAY = re.compile(rb'\[[^\[\]{}"]*\]')
+_RE_SPACE = re.compile(rb'\s*')
 
-    prefix = "  " * indent
+# Toute la sortie est accumulée puis écrite en une fois à la fin
+_buf = io.StringIO()
 
-    if isinstance(data, dict):
-        for key, value in data.items():
-            print(f"{prefix}{key}: {type(value)}", end="")
 
-            if isinstance(value, dict):
-                print(f" (dict with {len(value)} keys)")
-                if len(value) > 0 and current_depth < max_depth - 1:
-                    # Show first few sub-keys
-                    sub_keys = list(value.keys())[:3]
-                    print(f"{prefix}  sample keys: {sub_keys}")
-                    if len(sub_keys) > 0:
-                        debug_structure(value[sub_keys[0]], indent + 2, max_depth, current_depth + 1)
-            elif isinstance(value, list):
-                print(f" (list with {len(value)} items)")
-                if len(value) > 0 and current_depth < max_depth - 1:
-                    # Show type of first item
-                    print(f"{prefix}  first item type: {type(value[0])}")
-                    if isinstance(value[0], dict) and len(value[0]) > 0:
-                        sample_keys = list(value[0].keys())[:3]
-                        print(f"{prefix}  first item keys: {sample_keys}")
-            elif isinstance(value, str):
-                if len(value) > 50:
-                    print(f": {value[:50]}...")
-                else:
-                    print(f": {value}")
+def p(*args, **kwargs):
+    """print() into the output buffer."""
+    kwargs.setdefault('file', _buf)
+    print(*args, **kwargs)
+
+
+def _short(value, n=50):
+    """Value cut to n characters for display; containers are only described."""
+    t = type(value)
+    if t is dict or t is list:
+        return f"{t.__name__} with {len(value)} items"
+    s = value if t is str else repr(value)
+    return s[:n] + ('...' if len(s) > n else '')
+
+
+def walk(data, path=()):
+    """Yield (event, path, value) for a JSON tree, depth-first in document order.
+
+    Dicts and lists give 'enter_dict' / 'enter_list' and later 'exit', anything
+    else a 'leaf'. A container's children are only walked when True is sent
+    back for its enter event, so the consumers decide how deep the walk goes.
+    """
+    stack = []  # (path, container, children iterator)
+    value = data
+    while True:
+        t = type(value)
+        if t is dict or t is list:
+            descend = yield ('enter_dict' if t is dict else 'enter_list'), path, value
+            if descend:
+                stack.append((path, value, iter(value.items()) if t is dict else enumerate(value)))
             else:
-                print(f": {value}")
-    elif isinstance(data, list):
-        print(f"{prefix}List of {len(data)} items")
-        if len(data) > 0:
-            print(f"{prefix}First item type: {type(data[0])}")
-            if isinstance(data[0], dict):
-                debug_structure(data[0], indent + 1, max_depth, current_depth + 1)
+                yield 'exit', path, value
+        else:
+            yield 'leaf', path, value
 
+        # Next value: first remaining child of the innermost open container
+        while stack:
+            parent_path, parent, children = stack[-1]
+            child = next(children, None)
+            if child is not None:
+                key, value = child
+                path = parent_path + (key,)
+                break
+            stack.pop()
+            yield 'exit', parent_path, parent
+        else:
+            return
 
-print("=" * 70)
-print("DEEP STRUCTURE ANALYSIS OF CARDS.JSON")
-print("=" * 70)
 
-try:
-    with open(CARDS_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    print(f"\n📊 TOP LEVEL (type: {type(data)}, keys: {len(data)})")
-    debug_structure(data, indent=1, max_depth=4)
-    # Après la ligne "debug_structure(data, indent=1, max_depth=4)", ajoutez :
-    print(f"\n🔍 EXAMINING 'context' IN EACH EXPANSION...")
-
-    for expansion_code, expansion_data in data.items():
-        if isinstance(expansion_data, dict) and 'context' in expansion_data:
-            context = expansion_data['context']
-            print(f"\nExpansion {expansion_code} - context type: {type(context)}")
-
-            if isinstance(context, dict):
-                print(f"  Context has {len(context)} keys")
-                print(f"  Context keys: {list(context.keys())[:10]}")
-
-                # Look for cards in context
-                for key, value in context.items():
-                    if isinstance(value, list):
-                        print(f"    Key '{key}': list with {len(value)} items")
-                        if len(value) > 0:
-                            print(f"      First item type: {type(value[0])}")
-                            if isinstance(value[0], dict):
-                                print(f"      First item keys: {list(value[0].keys())[:5]}")
-    # Let's try to find cards more aggressively
-    print(f"\n🔍 SEARCHING FOR CARDS IN EXPANSIONS...")
+def drive(events, consumers):
+    """Feed each walk event to every consumer; descend if any of them asks to."""
+    try:
+        event = next(events)
+        while True:
+            descend = False
+            for consume in consumers:
+                if consume(*event):
+                    descend = True
+            event = events.send(descend)
+    except StopIteration:
+        pass
+
+
+def structure_printer(out, indent=0, max_depth=3):
+    """Consumer printing the structure: every item of the root, then the
+    first child of each sub-dict, down to max_depth."""
+    active = {(): (indent, 0)}  # path -> (indent, depth) of the nodes being described
+    active_dicts = {}
+    # Exact type checks against local names: JSON only produces plain dict/list/str
+    _dict, _list, _str, _type = dict, list, str, type
 
-    total_cards_found = 0
-    for expansion_code, expansion_data in data.items():
-        if isinstance(expansion_data, dict):
-            print(f"\nExpansion: {expansion_code}")
+    def consume(event, path, value):
+        if event == 'exit':
+            return False
+        descend = False
 
-            # Try different approaches to find cards
-            card_lists = []
+        # Only nodes that will print something are ever made active
+        node = active.get(path)
+        if node is not None:
+            node_indent, depth = node
+            if event == 'enter_dict':
+                active_dicts[path] = node
+                descend = True
+            elif event == 'enter_list':
+                prefix = PREFIXES[node_indent]
+                p(f"{prefix}List of {len(value)} items", file=out)
+                if len(value) > 0:
+                    first_type = _type(value[0])
+                    p(f"{prefix}First item type: {first_type}", file=out)
+                    if first_type is _dict and depth + 1 < max_depth:
+                        active[path + (0,)] = (node_indent + 1, depth + 1)
+                        descend = True
 
+        parent = active_dicts.get(path[:-1]) if path else None
+        if parent is None:
+            return descend
+
+        indent, current_depth = parent
+        prefix = PREFIXES[indent]
+        t = _type(value)
+        p(f"{prefix}{path[-1]}: {t}", end="", file=out)
+
+        if t is _dict:
+            p(f" (dict with {len(value)} keys)", file=out)
+            if len(value) > 0 and current_depth < max_depth - 1:
+                # Show first few sub-keys; only the first one is followed
+                it = iter(value)
+                first = next(it)
+                p(f"{PREFIXES[indent + 1]}sample keys: {[first, *islice(it, 2)]}", file=out)
+                active[path + (first,)] = (indent + 2, current_depth + 1)
+                descend = True
+        elif t is _list:
+            p(f" (list with {len(value)} items)", file=out)
+            if len(value) > 0 and current_depth < max_depth - 1:
+                # Show type of first item
+                first_type = _type(value[0])
+                p(f"{PREFIXES[indent + 1]}first item type: {first_type}", file=out)
+                if first_type is _dict and len(value[0]) > 0:
+                    sample_keys = list(islice(value[0], 3))
+                    p(f"{PREFIXES[indent + 1]}first item keys: {sample_keys}", file=out)
+        elif t is _str:
+            if len(value) > 50:
+                p(f": {value[:50]}...", file=out)
+            else:
+                p(f": {value}", file=out)
+        else:
+            p(f": {value}", file=out)
+        return descend
+
+    return consume
+
+
+def stream_structure(f, threshold=LARGE_LIST_THRESHOLD):
+    """Measure a JSON document from ijson events, without building it.
+
+    Returns (root type, number of root items, large lists), large lists being
+    the (path, length, first item keys) of every list longer than threshold.
+    Like the byte scan, lists nested inside other lists are not counted.
+    """
+    frames = []  # [kind, count, sample_keys]
+    array_counts = Counter()  # ijson prefix of a list -> number of items
+    first_item_keys = {}
+    open_lists = 0
+    root_type, root_len = None, 0
+
+    for prefix, event, value in ijson.parse(f):
+        if event == 'map_key':
+            frame = frames[-1]
+            frame[1] += 1
+            if len(frame[2]) < 6:
+                frame[2].append(value)
+            continue
+
+        if event == 'end_map' or event == 'end_array':
+            kind, count, sample_keys = frames.pop()
+            if not frames:
+                root_len = count
+            elif kind == 'list':
+                open_lists -= 1
+            elif open_lists == 1 and frames[-1][0] == 'list' and frames[-1][1] == 1:
+                first_item_keys[prefix[:-5]] = sample_keys
+            continue
+
+        # Every other event is a value: count it as an item of its parent list,
+        # whose items all carry the prefix '<list path>.item'
+        if frames and frames[-1][0] == 'list':
+            frames[-1][1] += 1
+            if open_lists == 1:
+                array_counts[prefix[:-5]] += 1
+
+        if event == 'start_map' or event == 'start_array':
+            kind = 'dict' if event == 'start_map' else 'list'
+            if not frames:
+                root_type = dict if kind == 'dict' else list
+            if kind == 'list':
+                open_lists += 1
+            frames.append([kind, 0, []])
+
+    large_lists = [(path, count, first_item_keys.get(path))
+                   for path, count in array_counts.items() if count > threshold]
+    return root_type, root_len, large_lists
+
+
+def context_collector(out):
+    """Consumer showing the 'context' entry of each expansion."""
+    def consume(event, path, value):
+        depth = len(path)
+        if depth < 2:
+            return event == 'enter_dict'  # root and expansions
+        if path[1] != 'context' or event == 'exit':
+            return False
+
+        if depth == 2:
+            p(f"\nExpansion {path[0]} - context type: {type(value)}", file=out)
+            if isinstance(value, dict):
+                p(f"  Context has {len(value)} keys", file=out)
+                p(f"  Context keys: {list(islice(value, 10))}", file=out)
+                return True
+        elif depth == 3 and isinstance(value, list):
+            # Look for cards in context
+            p(f"    Key '{path[2]}': list with {len(value)} items", file=out)
+            if len(value) > 0:
+                p(f"      First item type: {type(value[0])}", file=out)
+                if isinstance(value[0], dict):
+                    p(f"      First item keys: {list(islice(value[0], 5))}", file=out)
+        return False
+
+    return consume
+
+
+def card_collector(out, card_counts):
+    """Consumer looking for card lists directly under each expansion.
+
+    Fills card_counts with {(expansion code, list name): card count}.
+    """
+    found = []  # card lists of the current expansion
+
+    def consume(event, path, value):
+        depth = len(path)
+        if depth == 0:
+            return event == 'enter_dict'
+
+        if depth == 1:
+            if event == 'enter_dict':
+                if VERBOSE:
+                    p(f"\nExpansion: {path[0]}", file=out)
+                return True
+            if event == 'exit' and isinstance(value, dict):
+                # Count total cards
+                for list_name, card_list in found:
+                    card_counts[path[0], list_name] = len(card_list)
+                    if not VERBOSE:
+                        continue
+                    p(f"  List '{list_name}': {len(card_list)} cards", file=out)
+
+                    # Show a sample card
+                    if len(card_list) > 0:
+                        sample = card_list[0]
+                        p(f"  Sample card keys: {list(islice(sample, 8))}", file=out)
+                        for k, v in islice(sample.items(), 3):
+                            p(f"    {k}: {_short(v)}", file=out)
+                found.clear()
+        elif depth == 2 and event == 'enter_list':
             # Method 1: Direct lists in expansion
-            for key, value in expansion_data.items():
-                if isinstance(value, list):
-                    print(f"  Found list at key '{key}': {len(value)} items")
-                    if len(value) > 0 and isinstance(value[0], dict):
-                        print(f"    First item keys: {list(value[0].keys())[:5]}")
-                        card_lists.append((key, value))
-
-            # Count total cards
-            for list_name, card_list in card_lists:
-                total_cards_found += len(card_list)
-                print(f"  List '{list_name}': {len(card_list)} cards")
-
-                # Show a sample card
-                if len(card_list) > 0:
-                    sample = card_list[0]
-                    print(f"  Sample card keys: {list(sample.keys())[:8]}")
-                    for k, v in list(sample.items())[:3]:
-                        print(f"    {k}: {str(v)[:50]}...")
-
-    print(f"\n🎴 TOTAL CARDS FOUND (all methods): {total_cards_found}")
+            if VERBOSE:
+                p(f"  Found list at key '{path[1]}': {len(value)} items", file=out)
+            if value and type(value[0]) is dict:
+                if VERBOSE:
+                    p(f"    First item keys: {list(islice(value[0], 5))}", file=out)
+                found.append((path[1], value))
+        return False
 
-    # Alternative: try to find any list with more than 100 items
-    print(f"\n🔎 LOOKING FOR LARGE LISTS (>100 items)...")
+    return consume
+
+
+def scan_large_lists(path, threshold=LARGE_LIST_THRESHOLD):
+    """Find the lists longer than threshold straight from the file bytes.
+
+    Nothing is decoded except object keys: the file is memory-mapped and only
+    brackets, commas and string boundaries are looked at. Like the old dict
+    walk, lists nested inside other lists are not reported.
+    Returns (keys, length, first_item_is_dict) in document order.
+    """
+    results = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # frame: [is_list, keys, count, first_is_dict, expect_key, in_list]
+        stack = []
+        key = None
+        pos = 0
+        while True:
+            m = _RE_TOKEN.search(mm, pos)
+            if m is None:
+                break
+            start = m.start()
+            c = mm[start]
+            pos = start + 1
+
+            if c == 0x22:  # '"'
+                string = _RE_STRING.match(mm, start)
+                pos = string.end()
+                if stack and stack[-1][4]:
+                    raw = string.group(1)
+                    key = json.loads(b'"' + raw + b'"') if b'\\' in raw else raw.decode('utf-8')
+                    stack[-1][4] = False
+            elif c == 0x2C:  # ','
+                frame = stack[-1]
+                if frame[0]:
+                    frame[2] += 1
+                else:
+                    frame[4] = True
+            elif c == 0x7B or c == 0x5B:  # '{' or '['
+                if stack:
+                    parent = stack[-1]
+                    keys = parent[1] if parent[0] else parent[1] + (key,)
+                    in_list = parent[0] or parent[5]
+                else:
+                    keys, in_list = (), False
+
+                if c == 0x7B:
+                    stack.append([False, keys, 0, False, True, in_list])
+                    continue
+
+                # Liste de scalaires : on compte les virgules d'un coup
+                flat = _RE_FLAT_ARRAY.match(mm, start)
+                if flat is not None:
+                    pos = flat.end()
+                    body = mm[start + 1:pos - 1]
+                    count = body.count(b',') + 1 if body.strip() else 0
+                    if not in_list and count > threshold:
+                        results.append((keys, count, False))
+                    continue
 
+                first = _RE_SPACE.match(mm, pos).end()
+                first_char = mm[first:first + 1]
+                stack.append([True, keys, 0 if first_char == b']' else 1,
+                              first_char == b'{', False, in_list])
+            else:  # ']' or '}'
+                frame = stack.pop()
+                if frame[0] and not frame[5] and frame[2] > threshold:
+                    results.append((frame[1], frame[2], frame[3]))
+    return results
 
-    def find_large_lists(obj, path="", results=None):
-        if results is None:
-            results = []
 
-        if isinstance(obj, dict):
-            for key, value in obj.items():
-                new_path = f"{path}.{key}" if path else key
-                find_large_lists(value, new_path, results)
-        elif isinstance(obj, list):
-            if len(obj) > 100:
-                results.append((path, len(obj)))
-                if len(obj) > 0 and isinstance(obj[0], dict):
-                    print(f"  {path}: {len(obj)} items")
-                    print(f"    First item keys: {list(obj[0].keys())[:6]}")
-        return results
+def load_cards():
+    """Load cards.json, reusing the pickle of a previous run while it is newer than the file."""
+    if os.path.exists(CARDS_CACHE) and os.path.getmtime(CARDS_CACHE) >= os.path.getmtime(CARDS_FILE):
+        with open(CARDS_CACHE, 'rb') as f:
+            return pickle.load(f)
 
+    # orjson ne lit que des bytes UTF-8 : fichier ouvert en binaire
+    with open(CARDS_FILE, 'rb') as f:
+        data = orjson.loads(f.read()) if orjson is not None else json.load(f)
 
-    large_lists = find_large_lists(data)
-    print(f"Found {len(large_lists)} large lists")
+    try:
+        with open(CARDS_CACHE, 'wb') as f:
+            pickle.dump(data, f, protocol=5)
+    except OSError as e:
+        p(f"⚠️ Could not write {CARDS_CACHE}: {e}")
+    return data
+
+
+def iter_expansions():
+    """Yield (code, expansion) pairs from cards.json, one expansion in memory at a time."""
+    with open(CARDS_FILE, 'rb') as f:
+        yield from ijson.kvitems(f, '', use_float=True)
+
+
+p("=" * 70)
+p("DEEP STRUCTURE ANALYSIS OF CARDS.JSON")
+p("=" * 70)
+
+try:
+    # One walk feeds every section; each section is printed from its own buffer
+    context_out, cards_out = io.StringIO(), io.StringIO()
+    card_counts = {}
+    consumers = [card_collector(cards_out, card_counts)]
+    if VERBOSE:
+        # The context section is pure detail: not even walked in summary mode
+        consumers.insert(0, context_collector(context_out))
+
+    if ijson is not None:
+        # Streaming mode: memory stays O(one expansion) instead of O(file)
+        data = None
+        with open(CARDS_FILE, 'rb') as f:
+            root_type, root_len, large_lists = stream_structure(f)
+
+        p(f"\n📊 TOP LEVEL (type: {root_type}, keys: {root_len})")
+        if VERBOSE:
+            # Same printer as the eager mode: the root dict is entered by hand,
+            # then each expansion is walked as one of its items
+            printer = structure_printer(_buf, indent=1, max_depth=4)
+            printer('enter_dict', (), None)
+            consumers.insert(0, printer)
+        for expansion_code, expansion_data in iter_expansions():
+            drive(walk(expansion_data, (expansion_code,)), consumers)
+    else:
+        data = load_cards()
+
+        p(f"\n📊 TOP LEVEL (type: {type(data)}, keys: {len(data)})")
+        if VERBOSE:
+            consumers.insert(0, structure_printer(_buf, indent=1, max_depth=4))
+            drive(walk(data), consumers)
+        else:
+            # Nothing to print per list: the counts come straight from the two top levels
+            card_counts = {(exp, k): len(v)
+                           for exp, ed in data.items() if type(ed) is dict
+                           for k, v in ed.items()
+                           if type(v) is list and v and type(v[0]) is dict}
+
+    p(f"\n🔍 EXAMINING 'context' IN EACH EXPANSION...")
+    _buf.write(context_out.getvalue())
+
+    # Let's try to find cards more aggressively
+    p(f"\n🔍 SEARCHING FOR CARDS IN EXPANSIONS...")
+    _buf.write(cards_out.getvalue())
+
+    total_cards_found = sum(card_counts.values())
+    p(f"\n🎴 TOTAL CARDS FOUND (all methods): {total_cards_found}")
+
+    # Alternative: try to find any list with more than 100 items
+    p(f"\n🔎 LOOKING FOR LARGE LISTS (>{LARGE_LIST_THRESHOLD} items)...")
+    if data is None:
+        for path, length, first_keys in large_lists:
+            if VERBOSE and first_keys is not None:
+                p(f"  {path}: {length} items")
+                p(f"    First item keys: {first_keys}")
+    else:
+        large_lists = scan_large_lists(CARDS_FILE)
+        for keys, length, first_is_dict in large_lists:
+            if VERBOSE and first_is_dict:
+                first_item = reduce(getitem, keys, data)[0]
+                p(f"  {'.'.join(keys)}: {length} items")
+                p(f"    First item keys: {list(islice(first_item, 6))}")
+    p(f"Found {len(large_lists)} large lists")
 
 except Exception as e:
-    print(f" Error: {e}")
+    p(f" Error: {e}")
 
-print("\n" + "=" * 70)
\ No newline at end of file
+p("\n" + "=" * 70)
+sys.stdout.write(_buf.getvalue())
@@ -5,28 +5,127 @@ Improved version with:
 1. Better file naming to identify content
 2. Better handling of templates with no pages
 3. Improved template categorization
+
+Output is N-Triples; run with --jsonld to also write a JSON-LD copy.
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
 import os
 import time
 import json
+import atexit
+import functools
+import shelve
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from rdflib import Graph, URIRef, Literal, Namespace, RDF, RDFS
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import mwparserfromhell  # C-accelerated wikitext parser, used when available
+except ImportError:
+    mwparserfromhell = None
+
 # ---------------------------
 # Configuration
 # ---------------------------
 TOlkien = Namespace("http://example.org/tolkien/")
+PAGE_TITLE = TOlkien["pageTitle"]
+EXTRACTION_DATE = TOlkien["extractionDate"]
+TEMPLATE_TYPE = TOlkien["templateType"]
 FUSEKI_ENDPOINT = "http://localhost:3030/tolkienKG"
+# Keep-alive connections to Fuseki; uploads are streamed in chunks of this size,
+# files above FUSEKI_SPLIT_BYTES are sent as FUSEKI_UPLOAD_PARTS concurrent POSTs
+FUSEKI_UPLOAD_PARTS = 4
+FUSEKI_SPLIT_BYTES = 4 * 1024 * 1024
+FUSEKI_CHUNK_SIZE = 128 * 1024
+# Upload bodies are gzipped on the fly (N-Triples repeat the same IRIs); 0 sends them as is
+FUSEKI_GZIP_LEVEL = 3
+FUSEKI_SESSION = requests.Session()
+FUSEKI_SESSION.mount("http://", HTTPAdapter(pool_maxsize=FUSEKI_UPLOAD_PARTS))
 API_URL = "https://tolkiengateway.net/w/api.php"
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Cache to avoid repeated API calls
 TEMPLATE_PAGE_CACHE = {}
 
+# API results kept on disk between runs (template page lists, page wikitext)
+DISK_CACHE_FILE = os.path.join(PROJECT_ROOT, ".cache", "tg_pages.db")
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+# One keep-alive session for every API call; server errors are retried here
+# (throttling - 429/503 - is handled by api_get so that every thread slows down)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8, pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 504],
+                      raise_on_status=False)))
+
+# Parallel page fetching, with a global request rate shared by all threads
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 10
+THROTTLE_RETRIES = 5
+_rate_lock = threading.Lock()
+_next_request_time = 0.0
+
+# ---------------------------
+# Compiled Patterns
+# ---------------------------
+TEMPLATE_BRACES_RE = re.compile(r'\{\{|\}\}')
+TEMPLATE_NAME_END_RE = re.compile(r'\{\{|\}\}|\[\[|\]\]|\|')
+WS_RE = re.compile(r'\s+')
+PARAM_PIPE_SCAN_RE = re.compile(r'[{}|]')
+PARAM_EQUALS_SCAN_RE = re.compile(r'[{}=]')
+# HTML comments, <ref> and <span> elements (with their content), then any other tag
+TAG_STRIP_RE = re.compile(r'<!--.*?-->|<ref[^>]*>.*?</ref>|<span[^>]*>.*?</span>|<[^>]+>', re.DOTALL)
+LINK_RE = re.compile(r'\[\[([^\]|]+)(?:\|([^\]]+))?\]\]')
+TEMPLATE_SUB_RE = re.compile(r'\{\{([^}|]+)(?:\|([^}]+))?\}\}')
+NAMELIKE_RE = re.compile(r'\A[A-Z][a-zA-Z\s\-]+\Z')
+UNDERSCORES_RE = re.compile(r'_+')
+
+# Keyword rules, checked in order: the first category with a keyword in the name wins
+def _keyword_rules(rules):
+    """[(category, keywords)] -> ((category, one compiled alternation of the keywords), ...)."""
+    return tuple((category, re.compile("|".join(map(re.escape, keywords)))) for category, keywords in rules)
+
+RDF_TYPE_RULES = _keyword_rules([
+    ("Character", ['character', 'person', 'actor', 'author', 'artist']),
+    ("Location", ['location', 'kingdom', 'mountain', 'settlement']),
+    ("RaceOrCreature", ['dwarf', 'elf', 'men', 'hobbit', 'race', 'valar', 'maiar', 'dragon']),
+    ("Item", ['object', 'item', 'artifact']),
+    ("Event", ['event', 'battle', 'war', 'campaign']),
+    ("Media", ['film', 'book', 'album', 'game', 'video', 'song', 'poem']),
+])
+
+TEMPLATE_CATEGORY_RULES = _keyword_rules([
+    ('character', ['character', 'person', 'people', 'actor', 'author', 'artist', 'director', 'user']),
+    ('location', ['location', 'kingdom', 'mountain', 'settlement', 'amonhen', 'arnorian', 'gondorian']),
+    ('race_creature', ['dwarf', 'elf', 'men', 'hobbit', 'race', 'valar', 'maiar', 'dragon', 'druadan',
+                       'easterling', 'edain', 'ent', 'nandor', 'noldor', 'northmen', 'numenorean',
+                       'rohirrim', 'sindar', 'vanyar', 'avar', 'half-elf']),
+    ('item', ['object', 'item', 'artifact', 'collectible']),
+    ('event', ['event', 'battle', 'war', 'campaign', 'scene']),
+    ('media', ['film', 'book', 'album', 'game', 'video', 'song', 'poem', 'audiobook',
+               'board game', 'video game', 'chapter', 'letter', 'journal', 'mythlore']),
+])
+
+# Characters replaced by "_" in URI fragments
+_SAFE_TRANS = str.maketrans({c: "_" for c in '"\' :()[]{}|\\/#,;.!?@$%^&*+=~`'})
+
 # ---------------------------
 # Utility Functions - IMPROVED
 # ---------------------------
+@functools.lru_cache(maxsize=8192)
 def safe_uri_name(name):
     """Convert any name to a safe URI fragment."""
     if not name:
@@ -43,19 +142,112 @@ def safe_uri_name(name):
         safe = safe.split(" (")[0].strip()
 
     # Replace problematic characters
-    for char in ['"', "'", " ", ":", "(", ")", "[", "]", "{", "}",
-                 "|", "\\", "/", "#", ",", ";", ".", "!", "?", "@",
-                 "$", "%", "^", "&", "*", "+", "=", "~", "`"]:
-        safe = safe.replace(char, "_")
+    safe = safe.translate(_SAFE_TRANS)
 
     # Collapse multiple underscores
-    safe = re.sub(r"_+", "_", safe)
+    safe = UNDERSCORES_RE.sub("_", safe)
 
     # Remove leading/trailing underscores
     safe = safe.strip("_")
 
     return safe if safe else "unknown"
 
+@functools.lru_cache(maxsize=1024)
+def match_category(name_lower, rules, default):
+    """First category of the rules whose keywords appear in name_lower."""
+    for category, keywords_re in rules:
+        if keywords_re.search(name_lower):
+            return category
+    return default
+
+def wait_for_rate_limit():
+    """Block until the next API request slot is free (shared by all threads)."""
+    global _next_request_time
+
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_time - now
+        _next_request_time = max(now, _next_request_time) + 1.0 / REQUESTS_PER_SECOND
+
+    if wait > 0:
+        time.sleep(wait)
+
+def parse_json(response):
+    """Decode an API response body (orjson when installed, else stdlib json)."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+def pause_requests(delay):
+    """Hold back every thread's next request for at least `delay` seconds."""
+    global _next_request_time
+
+    with _rate_lock:
+        _next_request_time = max(_next_request_time, time.monotonic() + delay)
+
+def api_get(params, timeout):
+    """GET the API under the shared rate limit, backing off while throttled (429/503).
+
+    Retry-After is honoured when sent, otherwise the delay doubles from 1 s.
+    """
+    backoff = 1.0
+    for _ in range(THROTTLE_RETRIES):
+        wait_for_rate_limit()
+        response = SESSION.get(API_URL, params=params, timeout=timeout)
+        if response.status_code not in (429, 503):
+            return response
+
+        retry_after = response.headers.get("Retry-After", "")
+        delay = float(retry_after) if retry_after.isdigit() else backoff
+        print(f"    Throttled ({response.status_code}), waiting {delay:.0f}s")
+        pause_requests(delay)
+        backoff *= 2
+    return response
+
+# ---------------------------
+# Disk Cache
+# ---------------------------
+def _get_disk_cache():
+    """Open the shelve cache on first use (call with _disk_cache_lock held)."""
+    global _disk_cache
+    if _disk_cache is None:
+        os.makedirs(os.path.dirname(DISK_CACHE_FILE), exist_ok=True)
+        _disk_cache = shelve.open(DISK_CACHE_FILE, writeback=False)
+        atexit.register(_disk_cache.close)
+    return _disk_cache
+
+def disk_cache_get(key):
+    with _disk_cache_lock:
+        return _get_disk_cache().get(key)
+
+def disk_cache_put(key, value):
+    with _disk_cache_lock:
+        _get_disk_cache()[key] = value
+
+def memoize_disk_if(should_store):
+    """Cache the results of an API function on disk, keyed by its arguments.
+
+    Only results for which should_store(result) is true are stored, so failed
+    requests are tried again next run.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = repr((func.__name__, args, sorted(kwargs.items())))
+            result = disk_cache_get(key)
+            # Entries that would no longer be stored (e.g. from an older run) are fetched again
+            if result is None or not should_store(result):
+                result = func(*args, **kwargs)
+                if should_store(result):
+                    disk_cache_put(key, result)
+            return result
+        return wrapper
+    return decorator
+
+def _page_content_key(page_title):
+    """Disk cache key of a page's wikitext (same key as the old one-page fetch, so caches stay valid)."""
+    return repr(("get_page_content_improved", (page_title,), []))
+
 def get_all_infobox_templates():
     """Get ALL templates from Category:Infobox_templates with better filtering."""
     templates = []
@@ -76,12 +268,12 @@ def get_all_infobox_templates():
             params["cmcontinue"] = cmcontinue
 
         try:
-            response = requests.get(API_URL, params=params, timeout=30)
+            response = api_get(params, timeout=30)
             if response.status_code != 200:
                 print(f"  API Error: {response.status_code}")
                 break
 
-            data = response.json()
+            data = parse_json(response)
 
             if "query" in data:
                 batch = data["query"]["categorymembers"]
@@ -97,7 +289,6 @@ def get_all_infobox_templates():
 
             if "continue" in data:
                 cmcontinue = data["continue"]["cmcontinue"]
-                time.sleep(0.5)  # Be nice to the API
             else:
                 break
 
@@ -108,278 +299,391 @@ def get_all_infobox_templates():
     print(f"\nSucces : Found {len(templates)} infobox templates")
     return sorted(templates)
 
+def template_exists(template_name):
+    """True if the template page exists, False if not, None if the API could not tell.
+
+    embeddedin answers a nonexistent template like an unused one (no pages, no
+    error), so the page itself is looked up with prop=info.
+    """
+    params = {
+        "action": "query",
+        "titles": template_name,
+        "prop": "info",
+        "format": "json",
+    }
+
+    try:
+        response = api_get(params, timeout=20)
+        if response.status_code != 200:
+            return None
+
+        data = parse_json(response)
+    except Exception as e:
+        print(f"    Error checking {template_name}: {e}")
+        return None
+
+    if "error" in data:
+        return None
+
+    pages = data.get("query", {}).get("pages", {})
+    return bool(pages) and not any("missing" in page or "invalid" in page for page in pages.values())
+
+@memoize_disk_if(lambda result: result[1] in ("ok", "missing"))
 def get_pages_using_template_improved(template_name, limit=20):
-    """Get pages that use a specific template with better error handling."""
+    """Get pages that use a specific template with better error handling.
+
+    Returns (pages, reason), reason being "ok", "empty" (the template is used
+    nowhere), "missing" (no such template) or "error". "ok" and "missing" are
+    cached on disk; "empty" is cheap to check again and errors are retried.
+    """
     if template_name in TEMPLATE_PAGE_CACHE:
         print(f"  Using cached result for {template_name}")
-        return TEMPLATE_PAGE_CACHE[template_name][:limit]
+        pages, reason = TEMPLATE_PAGE_CACHE[template_name]
+        return pages[:limit], reason
 
     pages = []
+    reason = None
     geicontinue = None
-    attempts = 0
-    max_attempts = 3
 
     print(f"  Searching for pages using: {template_name}")
 
-    while attempts < max_attempts:
-        try:
-            params = {
-                "action": "query",
-                "generator": "embeddedin",
-                "geititle": template_name,
-                "geilimit": "50",  # Use 'min' for fewer results per request
-                "geinamespace": "0",  # Main namespace only
-                "prop": "info",
-                "format": "json",
-            }
-
-            if geicontinue:
-                params["geicontinue"] = geicontinue
+    # 5xx answers are retried by the SESSION adapter, throttling by api_get
+    while True:
+        params = {
+            "action": "query",
+            "generator": "embeddedin",
+            "geititle": template_name,
+            "geilimit": "max",  # Up to 500 per request: usually a single request
+            "geinamespace": "0",  # Main namespace only
+            "prop": "info",
+            "format": "json",
+        }
 
-            response = requests.get(API_URL, params=params, timeout=45)
+        if geicontinue:
+            params["geicontinue"] = geicontinue
 
-            if response.status_code == 403:
-                print(f"    Access forbidden for {template_name}. Skipping.")
-                TEMPLATE_PAGE_CACHE[template_name] = []
-                return []
+        try:
+            response = api_get(params, timeout=45)
+        except requests.exceptions.RequestException as e:
+            print(f"    Error: {e}")
+            reason = "error"
+            break
 
-            if response.status_code != 200:
-                print(f"    HTTP Error {response.status_code}")
-                attempts += 1
-                time.sleep(2)
-                continue
+        if response.status_code == 403:
+            print(f"    Access forbidden for {template_name}. Skipping.")
+            TEMPLATE_PAGE_CACHE[template_name] = ([], "error")
+            return [], "error"
 
-            data = response.json()
+        if response.status_code != 200:
+            print(f"    HTTP Error {response.status_code}")
+            reason = "error"
+            break
 
-            # Check for API errors
-            if "error" in data:
-                error_code = data["error"].get("code", "unknown")
-                error_info = data["error"].get("info", "")
-                print(f"    API Error {error_code}: {error_info[:100]}")
+        data = parse_json(response)
 
-                # Handle specific error cases
-                if error_code == "badtitle":
-                    print(f"    Template '{template_name}' may not exist or have invalid title")
-                    TEMPLATE_PAGE_CACHE[template_name] = []
-                    return []
+        # Check for API errors
+        if "error" in data:
+            error_code = data["error"].get("code", "unknown")
+            error_info = data["error"].get("info", "")
+            print(f"    API Error {error_code}: {error_info[:100]}")
 
-                attempts += 1
-                time.sleep(2)
-                continue
+            # Handle specific error cases
+            if error_code in ("badtitle", "invalidtitle"):
+                print(f"    Template '{template_name}' may not exist or have invalid title")
+                TEMPLATE_PAGE_CACHE[template_name] = ([], "missing")
+                return [], "missing"
+            reason = "error"
+            break
 
-            if "query" in data:
-                batch_pages = data["query"]["pages"]
-                new_pages = 0
-                for page_id, page_info in batch_pages.items():
-                    if "missing" not in page_info and page_info.get("ns", 0) == 0:
-                        pages.append(page_info["title"])
-                        new_pages += 1
-
-                if new_pages > 0:
-                    print(f"    Found {new_pages} pages (total: {len(pages)})")
-                else:
-                    print(f"    No new pages in this batch")
+        if "query" in data:
+            batch_pages = data["query"]["pages"]
+            new_pages = 0
+            for page_id, page_info in batch_pages.items():
+                if "missing" not in page_info and page_info.get("ns", 0) == 0:
+                    pages.append(page_info["title"])
+                    new_pages += 1
 
-            # Check if we should continue
-            if "continue" in data and len(pages) < limit:
-                geicontinue = data["continue"]["geicontinue"]
-                time.sleep(0.5)  # Be nice to the API
+            if new_pages > 0:
+                print(f"    Found {new_pages} pages (total: {len(pages)})")
             else:
-                break
-
-            # Stop if we have enough
-            if len(pages) >= limit:
-                break
-
-            attempts = 0  # Reset attempts on successful request
-
-        except requests.exceptions.Timeout:
-            print(f"    Timeout on attempt {attempts + 1}/{max_attempts}")
-            attempts += 1
-            time.sleep(3)
-        except Exception as e:
-            print(f"    Error: {e}")
-            attempts += 1
-            time.sleep(2)
+                print(f"    No new pages in this batch")
 
-    # Cache the result
-    TEMPLATE_PAGE_CACHE[template_name] = pages.copy()
-
-    if attempts >= max_attempts:
-        print(f"    Max attempts reached for {template_name}")
-
-    return pages[:limit]
+        # Check if we should continue
+        if "continue" in data and len(pages) < limit:
+            geicontinue = data["continue"]["geicontinue"]
+        else:
+            break
 
+    # Pages found before an error are still usable
+    if pages:
+        reason = "ok"
+    elif reason is None:
+        # No transclusions: tell an unused template from a nonexistent one
+        exists = template_exists(template_name)
+        if exists is None:
+            reason = "error"
+        else:
+            reason = "empty" if exists else "missing"
+            if not exists:
+                print(f"    Template '{template_name}' does not exist")
+
+    # Cache the result (errors are tried again)
+    if reason != "error":
+        TEMPLATE_PAGE_CACHE[template_name] = (pages.copy(), reason)
+
+    return pages[:limit], reason
+
+
+def _normalize_template_name(name):
+    """Compare template names the way MediaWiki does: no case, '_' == ' ', no 'Template:'."""
+    name = WS_RE.sub(" ", name.replace("_", " ")).strip().lower()
+    if name.startswith("template:"):
+        name = name[9:].strip()
+    return name
+
+@functools.lru_cache(maxsize=512)
+def _template_name_re(template_short):
+    """One regex classifying a normalized template name for this template.
+
+    The matching group says how it matched: 'exact' (the name, the name without
+    'infobox', or 'infobox <name>'), 'generic' (any other infobox) or 'simple'
+    (starts with the name stripped of 'infobox').
+    """
+    short = _normalize_template_name(template_short)
+    without_suffix = short.replace(" infobox", "")    # "dwarves infobox" -> "dwarves"
+    without_prefix = short.replace("infobox ", "")    # "infobox character" -> "character"
+    variants = {short, without_suffix, "infobox " + without_prefix}
+    simple_name = without_suffix.replace("infobox ", "")
+
+    exact = "|".join(re.escape(v) for v in sorted(variants, key=len, reverse=True))
+    return re.compile(rf'(?P<exact>{exact})\Z|(?P<generic>infobox.*|.* infobox)\Z|(?P<simple>{re.escape(simple_name)})',
+                      re.DOTALL)
+
+@functools.lru_cache(maxsize=512)
+def _template_needles(template_short):
+    """Words that any name matched by _template_name_re must contain, lowercased.
+
+    Empty when every template matches (nothing to rule out).
+    """
+    simple_name = _normalize_template_name(template_short).replace(" infobox", "").replace("infobox ", "")
+    if not simple_name:
+        return ()
+    # Longest word: present in the raw wikitext whatever the spacing/underscores
+    return ("infobox", max(simple_name.split(), key=len))
+
+def _split_template(inner):
+    """Split the inside of {{...}} into (name, body) at the first top-level '|'."""
+    depth = 0
+    for m in TEMPLATE_NAME_END_RE.finditer(inner):
+        token = m.group()
+        if token == "|":
+            if depth == 0:
+                return inner[:m.start()], inner[m.end():]
+        elif token == "{{" or token == "[[":
+            depth += 1
+        else:
+            depth -= 1
+    return inner, ""
+
+def split_top_level_pipes(text):
+    """(start, end) spans of the non-empty pieces of text between '|' outside {...}."""
+    spans = []
+    depth = 0
+    start = 0
+    for m in PARAM_PIPE_SCAN_RE.finditer(text):
+        char = m.group()
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif depth == 0:
+            if m.start() > start:
+                spans.append((start, m.start()))
+            start = m.end()
+    if len(text) > start:
+        spans.append((start, len(text)))
+    return spans
+
+def find_top_level_equals(text):
+    """Index of the first '=' outside {...}, or -1."""
+    depth = 0
+    for m in PARAM_EQUALS_SCAN_RE.finditer(text):
+        char = m.group()
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif depth == 0:
+            return m.start()
+    return -1
+
+def iter_top_level_templates(wikitext):
+    """Yield (name, body) for each top-level {{name|body}} of the wikitext.
+
+    One forward scan over the braces: nested templates stay whole inside the body.
+    """
+    depth = 0
+    start = 0
+    for m in TEMPLATE_BRACES_RE.finditer(wikitext):
+        if m.group() == "{{":
+            if depth == 0:
+                start = m.end()
+            depth += 1
+        elif depth > 0:
+            depth -= 1
+            if depth == 0:
+                yield _split_template(wikitext[start:m.start()])
+
+def _parse_template_params(template_content):
+    """Parse the body of a template invocation into {param: value} (pure Python parser)."""
+    properties = {}
+
+    # First, normalize the content
+    template_content = template_content.replace('\n\n', '\n')
+
+    # Split on the '|' outside nested templates (the regex jumps between braces and pipes)
+    lines = [template_content[start:end] for start, end in split_top_level_pipes(template_content)]
+
+    # Alternative simpler parsing for complex cases
+    if not lines or len(lines) < 2:
+        # Fall back to simple split if complex parsing failed
+        lines = [line.strip() for line in template_content.split('|') if line.strip()]
+
+    # Parse each line
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        # Skip template name line (usually first line without =)
+        if '=' not in line and not properties:
+            continue
+
+        if '=' in line:
+            # Find the first = that's not inside nested templates
+            equals_pos = find_top_level_equals(line)
+
+            if equals_pos > 0:
+                param_name = line[:equals_pos].strip()
+                param_value = line[equals_pos + 1:].strip()
+
+                # Clean up the parameter name
+                if param_name.startswith('|'):
+                    param_name = param_name[1:].strip()
+
+                if param_name and param_value:
+                    # Basic cleaning of the value
+                    param_value = WS_RE.sub(' ', param_value)  # Normalize whitespace
+
+                    # Remove leading/trailing quotes
+                    param_value = param_value.strip('"\'').strip()
+
+                    properties[param_name] = param_value
+            else:
+                # No = found, might be a continuation line
+                if properties and list(properties.keys()):
+                    # Append to last parameter
+                    last_param = list(properties.keys())[-1]
+                    properties[last_param] += " " + line
+        elif properties:
+            # Continuation line - append to last parameter
+            last_param = list(properties.keys())[-1]
+            properties[last_param] += " " + line
+
+    return properties
+
+def _mwp_template_params(template):
+    """{param: value} of a mwparserfromhell Template, same rules as _parse_template_params."""
+    properties = {}
+    for param in template.params:
+        param_value = str(param.value).strip()
+        if not param_value:
+            continue
+
+        if param.showkey:
+            param_name = str(param.name).strip()
+            if param_name:
+                # Basic cleaning of the value
+                param_value = WS_RE.sub(' ', param_value)
+                properties[param_name] = param_value.strip('"\'').strip()
+        elif properties:
+            # Positional value - append to last parameter
+            last_param = list(properties.keys())[-1]
+            properties[last_param] += " " + param_value
+    return properties
 
 def extract_template_data_improved(wikitext, template_name):
     """Extract data from ANY template invocation with better parsing."""
     template_short = template_name.replace("Template:", "")
 
-    # Try multiple patterns to catch different template formats
-    patterns = [
-        # Standard pattern with exact name
-        rf'\{{{{\s*{re.escape(template_short)}\s*\|([^}}]+)}}}}',
-        # Lowercase version (for cases like "dwarves infobox" vs "Dwarves infobox")
-        rf'\{{{{\s*{re.escape(template_short.lower())}\s*\|([^}}]+)}}}}',
-        # Without "infobox" suffix
-        rf'\{{{{\s*{re.escape(template_short.replace(" infobox", "").replace(" Infobox", ""))}\s*\|([^}}]+)}}}}',
-        # Without "infobox" suffix, lowercase
-        rf'\{{{{\s*{re.escape(template_short.replace(" infobox", "").replace(" Infobox", "").lower())}\s*\|([^}}]+)}}}}',
-        # Infobox X pattern (for "Infobox character" style)
-        rf'\{{{{\s*[Ii]nfobox\s+{re.escape(template_short.replace("Infobox ", "").replace("infobox ", ""))}\s*\|([^}}]+)}}}}',
-        # Generic pattern with template name variations
-        rf'\{{{{\s*[^{{|}}]*(?:{re.escape(template_short.split()[0]) if " " in template_short else re.escape(template_short)})[^{{|}}]*\|([^}}]+)}}}}',
-    ]
-
-    all_matches = []
-    used_pattern = ""
-
-    for i, pattern in enumerate(patterns):
-        matches = re.findall(pattern, wikitext, re.IGNORECASE | re.DOTALL)
-        if matches:
-            all_matches.extend(matches)
-            used_pattern = f"pattern {i + 1}"
-            # Don't break, collect ALL matches from this pattern
-            # But we can continue to try other patterns for different formats
+    # Cheap substring check before parsing: most pages cannot contain the template
+    needles = _template_needles(template_short)
+    if needles:
+        wikitext_lower = wikitext.lower()
+        if "{{" not in wikitext or not any(n in wikitext_lower for n in needles):
+            return []
+
+    name_re = _template_name_re(template_short)
+
+    # One pass: sort every template invocation by how its name matched
+    matches = {"exact": [], "generic": [], "simple": []}
+    if mwparserfromhell is not None:
+        templates = ((str(t.name), t) for t in mwparserfromhell.parse(wikitext).filter_templates(recursive=False)
+                     if t.params)
+    else:
+        templates = iter_top_level_templates(wikitext)
+    for name, body in templates:
+        if body:
+            m = name_re.match(_normalize_template_name(name))
+            if m:
+                matches[m.lastgroup].append(body)
+
+    all_matches = matches["exact"]
+    used_pattern = "template name"
 
     if not all_matches:
-        # Try generic infobox pattern as fallback
-        generic_pattern = r'\{\{\s*[Ii]nfobox[^}]*\|([^}]+)\}\}'
-        generic_matches = re.findall(generic_pattern, wikitext, re.DOTALL)
-        if generic_matches:
+        # Try generic infobox ("Infobox X" or "X infobox") as fallback
+        all_matches = matches["generic"]
+        if all_matches:
             print(f"    Using generic infobox pattern for {template_name}")
-            all_matches = generic_matches
             used_pattern = "generic infobox"
 
     if not all_matches:
         # One more attempt: look for ANY template with similar name
-        simple_name = template_short.replace(" infobox", "").replace(" Infobox", "").replace("Infobox ", "").replace(
-            "infobox ", "")
-        simple_pattern = rf'\{{{{\s*{re.escape(simple_name)}[^{{|}}]*\|([^}}]+)}}}}'
-        simple_matches = re.findall(simple_pattern, wikitext, re.IGNORECASE | re.DOTALL)
-        if simple_matches:
+        all_matches = matches["simple"]
+        if all_matches:
             print(f"    Using simplified pattern for {template_name}")
-            all_matches = simple_matches
             used_pattern = "simplified"
 
     if not all_matches:
-        # Debug: show a snippet of the wikitext to see what's there
+        # Debug: show what's there
         if "dwarf" in template_name.lower() or "dwarves" in template_name.lower():
             # Look for any mention of dwarf-related templates
-            dwarf_pattern = r'\{\{.*[Dd]warf.*\|'
-            dwarf_matches = re.findall(dwarf_pattern, wikitext)
-            if dwarf_matches:
-                print(f"    Found potential dwarf template: {dwarf_matches[0][:50]}...")
+            dwarf_names = [name for name, _ in iter_top_level_templates(wikitext) if "dwarf" in name.lower()]
+            if dwarf_names:
+                print(f"    Found potential dwarf template: {dwarf_names[0][:50]}...")
         return []
 
     # Debug output
-    if used_pattern:
-        print(f"    Found {len(all_matches)} matches using {used_pattern}")
+    print(f"    Found {len(all_matches)} matches using {used_pattern}")
 
     results = []
 
     for match in all_matches:
-        template_content = match
-
-        # Parse parameters with better handling of nested templates
-        properties = {}
-
-        # Improved parsing that handles nested templates better
-        lines = []
-        depth = 0
-        current_line = ""
-
-        # First, normalize the content
-        template_content = template_content.replace('\n\n', '\n')
-
-        # Parse character by character to handle nested templates
-        for char in template_content:
-            if char == '{':
-                depth += 1
-            elif char == '}':
-                depth -= 1
-
-            if char == '|' and depth == 0:
-                if current_line:
-                    lines.append(current_line)
-                    current_line = ""
-            else:
-                current_line += char
-
-        # Don't forget the last line
-        if current_line:
-            lines.append(current_line)
-
-        # Alternative simpler parsing for complex cases
-        if not lines or len(lines) < 2:
-            # Fall back to simple split if complex parsing failed
-            lines = [line.strip() for line in template_content.split('|') if line.strip()]
-
-        # Parse each line
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Skip template name line (usually first line without =)
-            if '=' not in line and not properties:
-                continue
-
-            if '=' in line:
-                # Find the first = that's not inside nested templates
-                equals_pos = -1
-                nested_depth = 0
-                for i, char in enumerate(line):
-                    if char == '{':
-                        nested_depth += 1
-                    elif char == '}':
-                        nested_depth -= 1
-                    elif char == '=' and nested_depth == 0:
-                        equals_pos = i
-                        break
-
-                if equals_pos > 0:
-                    param_name = line[:equals_pos].strip()
-                    param_value = line[equals_pos + 1:].strip()
-
-                    # Clean up the parameter name
-                    if param_name.startswith('|'):
-                        param_name = param_name[1:].strip()
-
-                    if param_name and param_value:
-                        # Basic cleaning of the value
-                        param_value = re.sub(r'\s+', ' ', param_value)  # Normalize whitespace
-
-                        # Remove leading/trailing quotes
-                        param_value = param_value.strip('"\'').strip()
-
-                        properties[param_name] = param_value
-                else:
-                    # No = found, might be a continuation line
-                    if properties and list(properties.keys()):
-                        # Append to last parameter
-                        last_param = list(properties.keys())[-1]
-                        properties[last_param] += " " + line
-            elif properties:
-                # Continuation line - append to last parameter
-                last_param = list(properties.keys())[-1]
-                properties[last_param] += " " + line
+        if mwparserfromhell is not None:
+            properties = _mwp_template_params(match)
+        else:
+            properties = _parse_template_params(match)
 
         if properties:
             # Clean up properties
             cleaned_properties = {}
             for key, value in properties.items():
                 if value and str(value).strip():
-                    # Remove common wikitext artifacts
-                    clean_value = str(value)
-                    # Remove HTML comments
-                    clean_value = re.sub(r'<!--.*?-->', '', clean_value, flags=re.DOTALL)
-                    # Remove ref tags
-                    clean_value = re.sub(r'<ref[^>]*>.*?</ref>', '', clean_value, flags=re.DOTALL)
-                    # Remove span tags
-                    clean_value = re.sub(r'<span[^>]*>.*?</span>', '', clean_value, flags=re.DOTALL)
+                    # Remove common wikitext artifacts (comments, refs, spans, tags) in one pass
+                    clean_value = TAG_STRIP_RE.sub('', str(value))
                     # Clean whitespace again
-                    clean_value = re.sub(r'\s+', ' ', clean_value).strip()
+                    clean_value = ' '.join(clean_value.split())
 
                     if clean_value:
                         cleaned_properties[key] = clean_value
@@ -389,90 +693,96 @@ def extract_template_data_improved(wikitext, template_name):
 
     return results
 
-def get_page_content_improved(page_title):
-    """Get wikitext content of a page with retry logic."""
+def _get_contents_group(titles):
+    """Get the wikitext of up to 50 pages in a single API request."""
     params = {
         "action": "query",
         "prop": "revisions",
         "rvprop": "content",
-        "titles": page_title,
+        "titles": "|".join(titles),
         "format": "json",
     }
 
-    for attempt in range(3):
-        try:
-            response = requests.get(API_URL, params=params, timeout=20)
-            if response.status_code != 200:
-                if attempt < 2:
-                    time.sleep(1)
-                    continue
-                return ""
-
-            data = response.json()
-
-            # Check for API errors
-            if "error" in data:
-                return ""
-
-            pages = data.get("query", {}).get("pages", {})
-            if not pages:
-                return ""
-
-            page = next(iter(pages.values()))
-            if "missing" in page:
-                return ""
-
-            revisions = page.get("revisions", [])
-            if revisions:
-                return revisions[0].get("*", "")
-
-            return ""
-
-        except requests.exceptions.Timeout:
-            if attempt < 2:
-                print(f"    Timeout fetching {page_title}, retrying...")
-                time.sleep(2)
-                continue
-        except Exception:
-            if attempt < 2:
-                time.sleep(1)
-                continue
-
-    return ""
+    try:
+        response = api_get(params, timeout=60)
+        if response.status_code != 200:
+            return {}
 
-def add_template_data_to_graph_improved(graph, page_title, template_name, properties):
-    """Add template data to RDF graph with better type assignment."""
+        data = parse_json(response)
+    except Exception as e:
+        print(f"    Error fetching {len(titles)} pages: {e}")
+        return {}
+
+    # Check for API errors
+    if "error" in data:
+        return {}
+
+    query = data.get("query", {})
+    # The API may normalize the titles we sent: key results by the original title
+    original_titles = {n["to"]: n["from"] for n in query.get("normalized", [])}
+
+    contents = {}
+    for page in query.get("pages", {}).values():
+        if "missing" in page:
+            continue
+        revisions = page.get("revisions", [])
+        if revisions:
+            title = original_titles.get(page["title"], page["title"])
+            contents[title] = revisions[0].get("*", "")
+    return contents
+
+def get_page_contents_batch(titles):
+    """Get the wikitext of many pages, 50 titles per API request: {title: wikitext}.
+
+    Pages already in the disk cache are not requested again.
+    """
+    contents = {}
+    missing = []
+    for title in titles:
+        wikitext = disk_cache_get(_page_content_key(title))
+        if wikitext:
+            contents[title] = wikitext
+        else:
+            missing.append(title)
+
+    groups = [missing[i:i + 50] for i in range(0, len(missing), 50)]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for group_contents in executor.map(_get_contents_group, groups):
+            for title, wikitext in group_contents.items():
+                if wikitext:
+                    disk_cache_put(_page_content_key(title), wikitext)
+            contents.update(group_contents)
+    return contents
+
+def _link_display(match):
+    """[[target|display]] -> display, [[target]] -> target."""
+    return match.group(2) if match.group(2) else match.group(1)
+
+def template_data_triples(page_title, template_name, properties, run_ts):
+    """Build the triples describing one template invocation of a page.
+
+    run_ts is the Literal timestamp of the extraction run.
+    """
     if not properties:
-        return False
+        return []
 
     # Create URI for the page
     page_uri = URIRef(TOlkien[safe_uri_name(page_title)])
 
+    triples = []
+
     # Add basic info
-    graph.add((page_uri, RDF.type, RDFS.Resource))
-    graph.add((page_uri, TOlkien["pageTitle"], Literal(page_title)))
-    graph.add((page_uri, TOlkien["extractionDate"], Literal(datetime.now().isoformat())))
+    triples.append((page_uri, RDF.type, RDFS.Resource))
+    triples.append((page_uri, PAGE_TITLE, Literal(page_title)))
+    triples.append((page_uri, EXTRACTION_DATE, run_ts))
 
     # Add template type with better classification
     template_clean = template_name.replace("Template:", "")
-    graph.add((page_uri, TOlkien["templateType"], Literal(template_clean)))
+    triples.append((page_uri, TEMPLATE_TYPE, Literal(template_clean)))
 
     # Determine RDF type based on template name
-    template_lower = template_clean.lower()
-    if any(x in template_lower for x in ['character', 'person', 'actor', 'author', 'artist']):
-        graph.add((page_uri, RDF.type, TOlkien["Character"]))
-    elif any(x in template_lower for x in ['location', 'kingdom', 'mountain', 'settlement']):
-        graph.add((page_uri, RDF.type, TOlkien["Location"]))
-    elif any(x in template_lower for x in ['dwarf', 'elf', 'men', 'hobbit', 'race', 'valar', 'maiar', 'dragon']):
-        graph.add((page_uri, RDF.type, TOlkien["RaceOrCreature"]))
-    elif any(x in template_lower for x in ['object', 'item', 'artifact']):
-        graph.add((page_uri, RDF.type, TOlkien["Item"]))
-    elif any(x in template_lower for x in ['event', 'battle', 'war', 'campaign']):
-        graph.add((page_uri, RDF.type, TOlkien["Event"]))
-    elif any(x in template_lower for x in ['film', 'book', 'album', 'game', 'video', 'song', 'poem']):
-        graph.add((page_uri, RDF.type, TOlkien["Media"]))
-    else:
-        graph.add((page_uri, RDF.type, TOlkien["Other"]))
+    rdf_type = match_category(template_clean.lower(), RDF_TYPE_RULES, "Other")
+    triples.append((page_uri, RDF.type, TOlkien[rdf_type]))
 
     # Add all properties with improved cleaning
     for prop_name, prop_value in properties.items():
@@ -483,18 +793,13 @@ def add_template_data_to_graph_improved(graph, page_title, template_name, proper
             clean_value = str(prop_value)
 
             # Handle links: extract the display text if available
-            def replace_link(match):
-                target = match.group(1)
-                display = match.group(2) if match.group(2) else target
-                return display
-
-            clean_value = re.sub(r'\[\[([^\]|]+)(?:\|([^\]]+))?\]\]', replace_link, clean_value)
+            clean_value = LINK_RE.sub(_link_display, clean_value)
 
             # Remove simple templates but keep their content
-            clean_value = re.sub(r'\{\{([^}|]+)(?:\|([^}]+))?\}\}', r'\1', clean_value)
+            clean_value = TEMPLATE_SUB_RE.sub(r'\1', clean_value)
 
-            # Remove HTML tags
-            clean_value = re.sub(r'<[^>]+>', '', clean_value)
+            # Remove HTML comments, refs, spans and tags
+            clean_value = TAG_STRIP_RE.sub('', clean_value)
 
             # Clean whitespace
             clean_value = ' '.join(clean_value.split())
@@ -502,18 +807,18 @@ def add_template_data_to_graph_improved(graph, page_title, template_name, proper
             if clean_value:
                 # Check if value looks like it could be a reference to another entity
                 if (len(clean_value) < 100 and
-                    re.match(r'^[A-Z][a-zA-Z\s\-]+$', clean_value) and
+                    NAMELIKE_RE.match(clean_value) and
                     ' ' in clean_value):  # Looks like a proper name with spaces
                     # Try to create a connection
                     try:
                         target_uri = URIRef(TOlkien[safe_uri_name(clean_value)])
-                        graph.add((page_uri, TOlkien[safe_prop], target_uri))
+                        triples.append((page_uri, TOlkien[safe_prop], target_uri))
                     except:
-                        graph.add((page_uri, TOlkien[safe_prop], Literal(clean_value)))
+                        triples.append((page_uri, TOlkien[safe_prop], Literal(clean_value)))
                 else:
-                    graph.add((page_uri, TOlkien[safe_prop], Literal(clean_value)))
+                    triples.append((page_uri, TOlkien[safe_prop], Literal(clean_value)))
 
-    return True
+    return triples
 
 def categorize_templates_improved(templates):
     """Categorize templates more accurately."""
@@ -527,47 +832,14 @@ def categorize_templates_improved(templates):
         'other': []
     }
 
-    character_keywords = ['character', 'person', 'people', 'actor', 'author', 'artist', 'director', 'user']
-    location_keywords = ['location', 'kingdom', 'mountain', 'settlement', 'amonhen', 'arnorian', 'gondorian']
-    race_keywords = ['dwarf', 'elf', 'men', 'hobbit', 'race', 'valar', 'maiar', 'dragon', 'druadan',
-                     'easterling', 'edain', 'ent', 'nandor', 'noldor', 'northmen', 'numenorean',
-                     'rohirrim', 'sindar', 'vanyar', 'avar', 'half-elf']
-    item_keywords = ['object', 'item', 'artifact', 'collectible']
-    event_keywords = ['event', 'battle', 'war', 'campaign', 'scene']
-    media_keywords = ['film', 'book', 'album', 'game', 'video', 'song', 'poem', 'audiobook',
-                      'board game', 'video game', 'chapter', 'letter', 'journal', 'mythlore']
-
     for template in templates:
         template_name = template.replace("Template:", "").lower()
-        categorized = False
-
-        # Check each category
-        if any(keyword in template_name for keyword in character_keywords):
-            categories['character'].append(template)
-            categorized = True
-        elif any(keyword in template_name for keyword in location_keywords):
-            categories['location'].append(template)
-            categorized = True
-        elif any(keyword in template_name for keyword in race_keywords):
-            categories['race_creature'].append(template)
-            categorized = True
-        elif any(keyword in template_name for keyword in item_keywords):
-            categories['item'].append(template)
-            categorized = True
-        elif any(keyword in template_name for keyword in event_keywords):
-            categories['event'].append(template)
-            categorized = True
-        elif any(keyword in template_name for keyword in media_keywords):
-            categories['media'].append(template)
-            categorized = True
-
-        if not categorized:
-            categories['other'].append(template)
+        categories[match_category(template_name, TEMPLATE_CATEGORY_RULES, 'other')].append(template)
 
     return categories
 
-def generate_descriptive_filename(category_choice, templates_count, timestamp):
-    """Generate descriptive filenames based on content."""
+def category_base_name(category_choice):
+    """tolkien_<category> prefix of the output files for a menu choice."""
     category_names = {
         '1': 'characters',
         '2': 'locations',
@@ -578,13 +850,249 @@ def generate_descriptive_filename(category_choice, templates_count, timestamp):
         '7': 'all_infoboxes'
     }
 
-    base_name = category_names.get(category_choice, 'unknown')
-    return f"tolkien_{base_name}_{templates_count}templates_{timestamp}.ttl"
+    return f"tolkien_{category_names.get(category_choice, 'unknown')}"
+
+def generate_descriptive_filename(category_choice, templates_count, timestamp):
+    """Generate descriptive filenames based on content."""
+    return f"{category_base_name(category_choice)}_{templates_count}templates_{timestamp}.nt"
+
+# ---------------------------
+# Streaming Output
+# ---------------------------
+_NT_ESCAPE = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+def nt_term(term):
+    """Format an rdflib term for N-Triples output."""
+    if isinstance(term, Literal):
+        lexical = str(term).translate(_NT_ESCAPE)
+        if term.language:
+            return f'"{lexical}"@{term.language}'
+        if term.datatype:
+            return f'"{lexical}"^^<{term.datatype}>'
+        return f'"{lexical}"'
+    return term.n3()
+
+def _last_line_end(f):
+    """Offset just after the last newline of a binary file (0 if there is none)."""
+    end = f.seek(0, os.SEEK_END)
+    while end > 0:
+        start = max(0, end - 65536)
+        f.seek(start)
+        pos = f.read(end - start).rfind(b"\n")
+        if pos != -1:
+            return start + pos + 1
+        end = start
+    return 0
+
+class TripleWriter:
+    """Append triples straight to an N-Triples file instead of an in-memory Graph.
+
+    Exposes addN() like rdflib.Graph; count includes the triples already in the file.
+    An existing file is first cut back to `size` bytes (default: its last complete
+    line), so what a crashed run left half-written is dropped.
+    A triple already written (by another template of the same page, or before the
+    crash) is skipped: the written lines are kept, which the few templates a run
+    selects keep small.
+    """
+
+    def __init__(self, filename, buffer_size=1 << 20, size=None):
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self._lines = set()
+        if os.path.exists(filename):
+            with open(filename, "r+b") as f:
+                f.truncate(_last_line_end(f) if size is None else size)
+                f.seek(0)
+                self._lines.update(f)
+        self.count = len(self._lines)
+        self._file = open(filename, "ab", buffering=buffer_size)
+
+    def add(self, triple):
+        s, p, o = triple
+        line = f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n".encode("utf-8")
+        if line in self._lines:
+            return
+        self._lines.add(line)
+        self._file.write(line)
+        self.count += 1
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.add((s, p, o))
+
+    def flush(self):
+        """Write the buffer out; returns the file size, every triple so far included."""
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __len__(self):
+        return self.count
+
+def checkpoint_file(work_file):
+    """Done-list kept next to the working .nt file."""
+    return work_file + ".done"
+
+def load_processed_pages(work_file):
+    """What an interrupted run finished: ({(page_title, template)}, committed .nt size).
+
+    The done-list has one JSON line per template, written only once all of its
+    triples were flushed, with the .nt size at that point. Anything written to
+    the .nt file after the last complete line is unfinished and gets cut off.
+    """
+    done_pages = set()
+    size = 0
+    done_file = checkpoint_file(work_file)
+    if os.path.exists(work_file) and os.path.exists(done_file):
+        with open(done_file, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Cut by the crash
+                entry = json.loads(line)
+                done_pages.update((page, entry["template"]) for page in entry["pages"])
+                size = entry["size"]
+
+    return done_pages, size
+
+def mark_processed(done_file, template, pages, size):
+    """Record a template's pages as done (call once their triples are flushed)."""
+    entry = {"template": template, "pages": pages, "size": size}
+    done_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    done_file.flush()
+
+def export_jsonld(nt_path):
+    """Write a JSON-LD copy of an N-Triples file next to it; returns the JSON-LD path."""
+    jsonld_file = nt_path.replace(".nt", ".jsonld")
+    full_graph = Graph()
+    full_graph.bind("tolkien", TOlkien)
+    full_graph.parse(nt_path, format="nt")
+    full_graph.serialize(jsonld_file, format="json-ld")
+    return jsonld_file
+
+# ---------------------------
+# Fuseki Upload
+# ---------------------------
+def iter_file_chunks(path, start=0, end=None, chunk_size=FUSEKI_CHUNK_SIZE):
+    """Yield the bytes [start, end) of a file chunk by chunk (never the whole file in memory)."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = (end if end is not None else os.path.getsize(path)) - start
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def gzip_chunks(chunks, level=FUSEKI_GZIP_LEVEL):
+    """Compress a stream of byte chunks into one gzip stream, chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def split_line_ranges(path, parts):
+    """Cut a file into up to `parts` (start, end) byte ranges that end on line boundaries.
+
+    N-Triples has one triple per line, so each range is a valid document.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def _post_range(path, start, end):
+    body = iter_file_chunks(path, start, end)
+    headers = {"Content-Type": "application/n-triples"}
+    if FUSEKI_GZIP_LEVEL:
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return FUSEKI_SESSION.post(FUSEKI_ENDPOINT, data=body, headers=headers, timeout=120)
+
+def post_to_fuseki(path):
+    """POST an N-Triples file to Fuseki as chunked streams, large files in concurrent parts.
+
+    Returns the responses, one per part.
+    """
+    parts = FUSEKI_UPLOAD_PARTS if os.path.getsize(path) > FUSEKI_SPLIT_BYTES else 1
+    ranges = split_line_ranges(path, parts)
+    with ThreadPoolExecutor(max_workers=len(ranges) or 1) as executor:
+        return list(executor.map(lambda r: _post_range(path, *r), ranges))
 
 # ---------------------------
 # Main Processing - IMPROVED
 # ---------------------------
-def main():
+def process_template(template_name, run_ts, done_pages=frozenset()):
+    """Fetch and extract the pages of one template (run in a worker thread).
+
+    Pages in done_pages (from an interrupted run) are skipped. Returns the
+    template's triples and counters; the output file is only touched by main().
+    """
+    result = {"template": template_name, "pages": 0, "processed": 0, "successful": 0, "skipped": 0,
+              "triples": [], "done": []}
+
+    print(f"\nProcessing: {template_name}")
+
+    # Get pages using this template (with improved function)
+    pages, reason = get_pages_using_template_improved(template_name, limit=15)
+
+    if not pages:
+        # Try alternative name (without "infobox" suffix), only if the template itself does not exist:
+        # an existing template with no transclusions is a definitive answer
+        if reason == "missing" and " infobox" in template_name.lower():
+            alt_name = template_name.replace(" infobox", "").replace(" Infobox", "")
+            print(f"  🔄 {template_name}: trying alternative name {alt_name}")
+            pages, reason = get_pages_using_template_improved(alt_name, limit=10)
+
+        if not pages:
+            return result
+
+    result["pages"] = len(pages)
+
+    template_clean = template_name.replace("Template:", "")
+    todo = [page_title for page_title in pages if (page_title, template_clean) not in done_pages]
+    result["skipped"] = len(pages) - len(todo)
+    pages = todo
+
+    # Get all page contents at once (50 titles per request)
+    contents = get_page_contents_batch(pages)
+
+    for page_title in pages:
+        wikitext = contents.get(page_title, "")
+        if not wikitext:
+            continue
+
+        result["processed"] += 1
+        result["done"].append(page_title)
+
+        # Extract template data with improved function
+        template_data_list = extract_template_data_improved(wikitext, template_name)
+
+        # If no data found with specific template, try generic infobox
+        if not template_data_list and "infobox" in template_name.lower():
+            template_data_list = extract_template_data_improved(wikitext, "infobox")
+
+        # A page can invoke the template several times: its triples are written once
+        page_triples = {}
+        for template_data in template_data_list:
+            triples = template_data_triples(page_title, template_name, template_data, run_ts)
+            if triples:
+                page_triples.update(dict.fromkeys(triples))
+                result["successful"] += 1
+        result["triples"].extend(page_triples)
+
+    return result
+
+def main(write_jsonld=False):
     print("=" * 80)
     print("TOLKIEN GATEWAY - IMPROVED INFOBOX TEMPLATES EXTRACTOR")
     print("=" * 80)
@@ -665,14 +1173,22 @@ def main():
         print("Using default: Location templates (first 5)")
         selected_templates = categories['location'][:5]
 
-    # Step 4: Process selected templates
-    graph = Graph()
-    graph.bind("tolkien", TOlkien)
+    # Step 4: Process selected templates, streaming triples to disk
+    # The working file keeps its name until the run completes, so a crashed run resumes from it
+    work_file = os.path.join(PROJECT_ROOT, "data", f"{category_base_name(choice)}_in_progress.nt")
+    done_pages, committed_size = load_processed_pages(work_file)
+    if done_pages:
+        print(f"\nResuming {work_file}: {len(done_pages)} pages already extracted")
 
-    # Define common RDF types
-    for rdf_type in ["Character", "Location", "RaceOrCreature", "Item", "Event", "Media", "Other"]:
-        graph.add((TOlkien[rdf_type], RDF.type, RDFS.Class))
-        graph.add((TOlkien[rdf_type], RDFS.label, Literal(rdf_type)))
+    graph = TripleWriter(work_file, size=committed_size)
+    done_file = open(checkpoint_file(work_file), "w" if committed_size == 0 else "a", encoding="utf-8")
+
+    if len(graph) == 0:
+        # Define common RDF types
+        rdf_types = ["Character", "Location", "RaceOrCreature", "Item", "Event", "Media", "Other"]
+        graph.addN((TOlkien[rdf_type], predicate, obj, graph)
+                   for rdf_type in rdf_types
+                   for predicate, obj in ((RDF.type, RDFS.Class), (RDFS.label, Literal(rdf_type))))
 
     total_templates_attempted = 0
     total_templates_with_pages = 0
@@ -684,64 +1200,41 @@ def main():
     print("=" * 80)
 
     start_time = time.time()
+    # One timestamp for the whole extraction run
+    run_ts = Literal(datetime.now().isoformat())
 
-    for template_idx, template_name in enumerate(selected_templates, 1):
-        print(f"\n[{template_idx}/{len(selected_templates)}] Processing: {template_name}")
+    # Templates are independent: process them in parallel, merge the triples here
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(process_template, template_name, run_ts, done_pages) for template_name in selected_templates]
 
-        total_templates_attempted += 1
+        for done_idx, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            template_name = result["template"]
+            print(f"\n[{done_idx}/{len(selected_templates)}] Done: {template_name}")
 
-        # Get pages using this template (with improved function)
-        pages = get_pages_using_template_improved(template_name, limit=15)
+            total_templates_attempted += 1
 
-        if not pages:
-            print(f"  ⚠️  No pages found using this template")
-            # Try alternative name (without "infobox" suffix)
-            if " infobox" in template_name.lower():
-                alt_name = template_name.replace(" infobox", "").replace(" Infobox", "")
-                print(f"  🔄 Trying alternative name: {alt_name}")
-                pages = get_pages_using_template_improved(alt_name, limit=10)
-
-            if not pages:
+            if not result["pages"]:
+                print(f"  ⚠️  No pages found using this template")
                 continue
 
-        total_templates_with_pages += 1
-        print(f"  📄 Found {len(pages)} pages to process")
+            total_templates_with_pages += 1
+            total_pages += result["processed"]
+            total_successful += result["successful"]
+            graph.addN((s, p, o, graph) for s, p, o in result["triples"])
+            mark_processed(done_file, result["template"].replace("Template:", ""), result["done"], graph.flush())
 
-        template_pages_processed = 0
-        template_pages_successful = 0
-
-        for page_idx, page_title in enumerate(pages, 1):
-            if page_idx % 5 == 0:
-                print(f"    Processing page {page_idx}/{len(pages)}...")
-
-            # Get page content with improved function
-            wikitext = get_page_content_improved(page_title)
-            if not wikitext:
-                continue
-
-            total_pages += 1
-            template_pages_processed += 1
-
-            # Extract template data with improved function
-            template_data_list = extract_template_data_improved(wikitext, template_name)
-
-            # If no data found with specific template, try generic infobox
-            if not template_data_list and "infobox" in template_name.lower():
-                template_data_list = extract_template_data_improved(wikitext, "infobox")
-
-            if template_data_list:
-                for template_data in template_data_list:
-                    if add_template_data_to_graph_improved(graph, page_title, template_name, template_data):
-                        total_successful += 1
-                        template_pages_successful += 1
-
-            # Be nice to the API
-            time.sleep(0.2)
-
-        success_rate = (template_pages_successful / template_pages_processed * 100) if template_pages_processed > 0 else 0
-        print(f"  Success : Results: {template_pages_successful}/{template_pages_processed} pages successful ({success_rate:.1f}%)")
+            template_pages_processed = result["processed"]
+            template_pages_successful = result["successful"]
+            success_rate = (template_pages_successful / template_pages_processed * 100) if template_pages_processed > 0 else 0
+            print(f"  📄 {result['pages']} pages found")
+            if result["skipped"]:
+                print(f"  ⏭️  {result['skipped']} pages already extracted in the interrupted run")
+            print(f"  Success : Results: {template_pages_successful}/{template_pages_processed} pages successful ({success_rate:.1f}%)")
 
     elapsed = time.time() - start_time
+    graph.close()
+    done_file.close()
 
     # Step 5: Summary and save results
     print(f"\n" + "=" * 80)
@@ -763,7 +1256,6 @@ def main():
     # Save results with descriptive filename
     if len(graph) > 0:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
         # Generate descriptive filename
         filename = generate_descriptive_filename(choice, total_templates_with_pages, timestamp)
@@ -772,19 +1264,56 @@ def main():
         os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
 
         try:
-            # Save in multiple formats for flexibility
-            graph.serialize(OUTPUT_FILE, format="turtle")
-
-            # Also save as JSON-LD for easier inspection
-            jsonld_file = OUTPUT_FILE.replace(".ttl", ".jsonld")
-            graph.serialize(jsonld_file, format="json-ld")
+            # N-Triples were streamed during the run (convert to Turtle afterwards with `riot --output=turtle`)
+            os.replace(work_file, OUTPUT_FILE)
+            os.remove(checkpoint_file(work_file))
+            output_files = [OUTPUT_FILE]
 
             file_size_kb = os.path.getsize(OUTPUT_FILE) / 1024
             print(f"\n💾 Saved files:")
-            print(f"   Turtle: {OUTPUT_FILE}")
-            print(f"   JSON-LD: {jsonld_file}")
+            print(f"   N-Triples: {OUTPUT_FILE}")
             print(f"   File size: {file_size_kb:.1f} KB")
 
+            # JSON-LD only on request: it needs the whole graph expanded in memory.
+            # Built in a background thread while the upload below waits on the network
+            jsonld_pool = jsonld_job = None
+            if write_jsonld:
+                jsonld_pool = ThreadPoolExecutor(max_workers=1)
+                jsonld_job = jsonld_pool.submit(export_jsonld, OUTPUT_FILE)
+
+            # Send to Fuseki
+            print(f"\n" + "=" * 80)
+            print("SENDING TO FUSEKI")
+            print("=" * 80)
+
+            try:
+                responses = post_to_fuseki(OUTPUT_FILE)
+                failed = [r for r in responses if r.status_code not in [200, 201, 204]]
+
+                if not failed:
+                    print(f" Successfully sent to Fuseki! ({len(responses)} parts)")
+                    print(f"   Dataset now contains ~{len(graph)} triples")
+                for response in failed:
+                    print(f"⚠️  Fuseki returned status {response.status_code}")
+                    if response.text:
+                        print(f"   Message: {response.text[:200]}...")
+            except requests.exceptions.ConnectionError:
+                print("⚠️  Could not connect to Fuseki. Is it running?")
+                print("   Start with: ./fuseki-server --update --mem /tolkienKG")
+            except Exception as e:
+                print(f"⚠️  Error sending to Fuseki: {e}")
+
+            print()
+            if jsonld_job is not None:
+                try:
+                    jsonld_file = jsonld_job.result()
+                    output_files.append(jsonld_file)
+                    print(f"   JSON-LD: {jsonld_file}")
+                except Exception as e:
+                    print(f"⚠️  Error writing JSON-LD: {e}")
+                finally:
+                    jsonld_pool.shutdown()
+
             # Generate a manifest file describing the contents
             manifest = {
                 "extraction_date": datetime.now().isoformat(),
@@ -795,51 +1324,25 @@ def main():
                 "rdf_triples": len(graph),
                 "processing_time_seconds": elapsed,
                 "templates_list": selected_templates[:20],  # First 20 only
-                "output_files": [OUTPUT_FILE, jsonld_file]
+                "output_files": output_files
             }
 
-            manifest_file = OUTPUT_FILE.replace(".ttl", "_manifest.json")
+            manifest_file = OUTPUT_FILE.replace(".nt", "_manifest.json")
+            # One write of the whole document (json.dump writes piece by piece)
+            if orjson is not None:
+                manifest_json = orjson.dumps(manifest, option=orjson.OPT_INDENT_2).decode("utf-8")
+            else:
+                manifest_json = json.dumps(manifest, indent=2, ensure_ascii=False)
             with open(manifest_file, 'w', encoding='utf-8') as f:
-                json.dump(manifest, f, indent=2, ensure_ascii=False)
+                f.write(manifest_json)
 
             print(f"   Manifest: {manifest_file}")
 
-            # Send to Fuseki
-            print(f"\n" + "=" * 80)
-            print("SENDING TO FUSEKI")
-            print("=" * 80)
-
-            try:
-                with open(OUTPUT_FILE, "rb") as f:
-                    response = requests.post(
-                        FUSEKI_ENDPOINT,
-                        data=f,
-                        headers={"Content-Type": "text/turtle"},
-                        timeout=120
-                    )
-
-                    if response.status_code in [200, 201, 204]:
-                        print(" Successfully sent to Fuseki!")
-                        print(f"   Dataset now contains ~{len(graph)} triples")
-                    else:
-                        print(f"⚠️  Fuseki returned status {response.status_code}")
-                        if response.text:
-                            print(f"   Message: {response.text[:200]}...")
-            except requests.exceptions.ConnectionError:
-                print("⚠️  Could not connect to Fuseki. Is it running?")
-                print("   Start with: ./fuseki-server --update --mem /tolkienKG")
-            except Exception as e:
-                print(f"⚠️  Error sending to Fuseki: {e}")
-
         except Exception as e:
             print(f" Error saving files: {e}")
-            # Try to save at least in NT format
-            try:
-                backup_file = os.path.join(PROJECT_ROOT, "data", f"backup_{timestamp}.nt")
-                graph.serialize(backup_file, format="nt")
-                print(f" Backup saved as NTriples: {backup_file}")
-            except:
-                print(" Error saving backup file either")
+            # The triples are already on disk as N-Triples
+            saved_file = OUTPUT_FILE if os.path.exists(OUTPUT_FILE) else work_file
+            print(f" Triples kept in: {saved_file}")
     else:
         print("\nWarning: No data extracted. Check your template selection and API connection.")
 
@@ -855,4 +1358,4 @@ def main():
         print(f"   • Some templates might be obsolete or rarely used")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(write_jsonld="--jsonld" in sys.argv[1:])
\ No newline at end of file
@@ -3,6 +3,12 @@ Debug: Find the actual cards in cards.json
 """
 import json
 import os
+from collections import Counter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CARDS_FILE = os.path.join(PROJECT_ROOT, "data", "cards.json")
@@ -12,8 +18,9 @@ print("FINDING CARDS IN THE ACTUAL STRUCTURE")
 print("=" * 70)
 
 try:
-    with open(CARDS_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # orjson only takes UTF-8 bytes: open in binary mode
+    with open(CARDS_FILE, 'rb') as f:
+        data = orjson.loads(f.read()) if orjson is not None else json.load(f)
 
     print(f" JSON loaded. Top-level keys: {list(data.keys())}")
 
@@ -59,36 +66,61 @@ try:
     print(f"\n🔎 RECURSIVE SEARCH FOR CARDS...")
 
 
-    def find_cards(obj, path="", depth=0, max_depth=5):
-        if depth >= max_depth:
-            return []
-
-        cards = []
-
-        if isinstance(obj, dict):
-            # Check if this looks like a card
-            if ('name' in obj or 'Name' in obj or 'title' in obj) and len(obj) > 2:
-                cards.append((path, obj))
+    def _node_path(node):
+        """Rebuild 'a.b[0].c' from a (parent, key) chain, only for the nodes we report."""
+        parts = []
+        while node is not None:
+            node, key = node
+            parts.append(f"[{key}]" if type(key) is int else f".{key}")
+        path = "".join(reversed(parts))
+        return path[1:] if path.startswith(".") else path
 
-            # Recursively search
-            for key, value in obj.items():
-                new_path = f"{path}.{key}" if path else key
-                cards.extend(find_cards(value, new_path, depth + 1, max_depth))
+    def find_cards(root, max_depth=5, max_results=None):
+        """Dicts that look like cards, in document order, without recursion.
 
-        elif isinstance(obj, list):
-            for i, item in enumerate(obj):
-                new_path = f"{path}[{i}]"
-                cards.extend(find_cards(item, new_path, depth + 1, max_depth))
-
-        return cards
-
-
-    cards_found = find_cards(data)
-    print(f"Found {len(cards_found)} potential cards")
+        Returns (cards, total): total counts every match, but only the first
+        max_results (None: all) are kept as (path, card). Paths are kept as
+        (parent, key) links and turned into strings only for the kept cards.
+        """
+        cards = []
+        total = 0
+        if max_depth <= 0 or type(root) not in (dict, list):
+            return cards, total
+
+        stack = [(root, None, 0)]
+        push = stack.append
+        while stack:
+            obj, node, depth = stack.pop()
+            child_depth = depth + 1
+
+            if type(obj) is dict:
+                # Check if this looks like a card
+                if ('name' in obj or 'Name' in obj or 'title' in obj) and len(obj) > 2:
+                    total += 1
+                    if max_results is None or total <= max_results:
+                        cards.append((_node_path(node), obj))
+                children = reversed(obj.items())  # reversed: children are popped in order
+            else:
+                children = zip(range(len(obj) - 1, -1, -1), reversed(obj))
+
+            # Only containers are pushed: scalars can't be cards
+            if child_depth < max_depth:
+                for key, value in children:
+                    vt = type(value)
+                    if vt is dict or vt is list:
+                        push((value, (node, key), child_depth))
+
+        return cards, total
+
+
+    # Only the first few are shown: the others are just counted
+    SAMPLE_SIZE = 3
+    cards_found, total_cards = find_cards(data, max_results=SAMPLE_SIZE)
+    print(f"Found {total_cards} potential cards")
 
     if cards_found:
-        print(f"\n📋 SAMPLE CARDS (first 3):")
-        for i, (path, card) in enumerate(cards_found[:3], 1):
+        print(f"\n📋 SAMPLE CARDS (first {SAMPLE_SIZE}):")
+        for i, (path, card) in enumerate(cards_found, 1):
             print(f"\n  Card {i} at path: {path}")
             for key, value in list(card.items())[:6]:
                 print(f"    {key}: {str(value)[:50]}...")
@@ -97,35 +129,36 @@ try:
     print(f"\n📊 COUNTING ALL LISTS IN THE STRUCTURE...")
 
 
-    def count_lists(obj, depth=0, max_depth=4):
-        counts = {}
-
-        if depth >= max_depth:
-            return counts
-
-        if isinstance(obj, dict):
-            for key, value in obj.items():
-                if isinstance(value, list):
-                    if key not in counts:
-                        counts[key] = 0
-                    counts[key] += len(value)
-
-                    # Recursively count in list items
-                    if len(value) > 0 and depth < max_depth - 1:
-                        for item in value[:2]:  # Just first 2 items
-                            sub_counts = count_lists(item, depth + 1, max_depth)
-                            for sub_key, sub_count in sub_counts.items():
-                                if sub_key not in counts:
-                                    counts[sub_key] = 0
-                                counts[sub_key] += sub_count
-
-        elif isinstance(obj, list):
-            for item in obj:
-                sub_counts = count_lists(item, depth + 1, max_depth)
-                for sub_key, sub_count in sub_counts.items():
-                    if sub_key not in counts:
-                        counts[sub_key] = 0
-                    counts[sub_key] += sub_count
+    def count_lists(root, max_depth=4):
+        """Total length of the lists found under each key (first 2 items of each list explored)."""
+        counts = Counter()
+        # Items are (obj, depth), or (None, key, length) markers so keys are counted in document order
+        stack = [(root, 0)]
+        push = stack.append
+        while stack:
+            item = stack.pop()
+            if len(item) == 3:
+                counts[item[1]] += item[2]
+                continue
+
+            obj, depth = item
+            if depth >= max_depth:
+                continue
+
+            t = type(obj)
+            if t is dict:
+                for key, value in reversed(obj.items()):
+                    if type(value) is list:
+                        # Recursively count in list items (just first 2 items)
+                        if value and depth < max_depth - 1:
+                            for sub in reversed(value[:2]):
+                                push((sub, depth + 1))
+                        push((None, key, len(value)))
+            elif t is list:
+                for sub in reversed(obj):
+                    st = type(sub)
+                    if st is dict or st is list:
+                        push((sub, depth + 1))
 
         return counts
 
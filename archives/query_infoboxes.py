@@ -1,7 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
 FUSEKI_QUERY_ENDPOINT = "http://localhost:3030/tolkienKG/query"
 
+# Keep-alive connections shared by all queries (requests.post opens a new one each time)
+SESSION = requests.Session()
+
 
 def query_infoboxes():
     """Query all infobox data from Fuseki."""
@@ -11,10 +16,6 @@ def query_infoboxes():
         "Content-Type": "application/x-www-form-urlencoded"
     }
 
-    print("=" * 70)
-    print("INFOBOX TEMPLATES QUERY TOOL")
-    print("=" * 70)
-
     # 1. Count total items
     query1 = """
     PREFIX tolkien: <http://example.org/tolkien/>
@@ -25,12 +26,6 @@ def query_infoboxes():
     }
     """
 
-    print("\n1. Total infobox items:")
-    results = execute_query(query1, headers)
-    if results:
-        count = results["results"]["bindings"][0]["total_items"]["value"]
-        print(f"   {count} items extracted from infoboxes")
-
     # 2. Templates distribution
     query2 = """
     PREFIX tolkien: <http://example.org/tolkien/>
@@ -43,16 +38,6 @@ def query_infoboxes():
     ORDER BY DESC(?count)
     """
 
-    print("\n2. Templates distribution:")
-    results = execute_query(query2, headers)
-    if results:
-        print("   Template                  Count")
-        print("   " + "-" * 40)
-        for row in results["results"]["bindings"]:
-            template = row["template"]["value"]
-            count = row["count"]["value"]
-            print(f"   {template:25} {count:>5}")
-
     # 3. Categories overview
     query3 = """
     PREFIX tolkien: <http://example.org/tolkien/>
@@ -67,14 +52,6 @@ def query_infoboxes():
     ORDER BY DESC(?count)
     """
 
-    print("\n3. Categories overview:")
-    results = execute_query(query3, headers)
-    if results:
-        for row in results["results"]["bindings"]:
-            category = row["category"]["value"].split("/")[-1]
-            count = row["count"]["value"]
-            print(f"   {category:15} : {count} items")
-
     # 4. Sample data from each template
     query4 = """
     PREFIX tolkien: <http://example.org/tolkien/>
@@ -88,8 +65,41 @@ def query_infoboxes():
     LIMIT 30
     """
 
+    print("=" * 70)
+    print("INFOBOX TEMPLATES QUERY TOOL")
+    print("=" * 70)
+
+    # The four queries are independent: send them together, print in order
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pending = [pool.submit(fetch_query, q, headers)
+                   for q in (query1, query2, query3, query4)]
+
+    print("\n1. Total infobox items:")
+    results = report_query(pending[0])
+    if results:
+        count = results["results"]["bindings"][0]["total_items"]["value"]
+        print(f"   {count} items extracted from infoboxes")
+
+    print("\n2. Templates distribution:")
+    results = report_query(pending[1])
+    if results:
+        print("   Template                  Count")
+        print("   " + "-" * 40)
+        for row in results["results"]["bindings"]:
+            template = row["template"]["value"]
+            count = row["count"]["value"]
+            print(f"   {template:25} {count:>5}")
+
+    print("\n3. Categories overview:")
+    results = report_query(pending[2])
+    if results:
+        for row in results["results"]["bindings"]:
+            category = row["category"]["value"].split("/")[-1]
+            count = row["count"]["value"]
+            print(f"   {category:15} : {count} items")
+
     print("\n4. Sample items (template + name):")
-    results = execute_query(query4, headers)
+    results = report_query(pending[3])
     if results:
         print("   Template                Name")
         print("   " + "-" * 60)
@@ -103,12 +113,12 @@ def query_infoboxes():
             print(f"     - {name}")
 
 
-def execute_query(sparql_query, headers):
-    """Execute a SPARQL query."""
+def fetch_query(sparql_query, headers):
+    """Run a SPARQL query without printing: returns (results, error message)."""
     params = {"query": sparql_query}
 
     try:
-        response = requests.post(
+        response = SESSION.post(
             FUSEKI_QUERY_ENDPOINT,
             data=params,
             headers=headers,
@@ -116,14 +126,28 @@ def execute_query(sparql_query, headers):
         )
 
         if response.status_code == 200:
-            return response.json()
+            return response.json(), None
         else:
-            print(f"   Error: {response.status_code}")
-            return None
+            return None, f"Error: {response.status_code}"
 
     except Exception as e:
-        print(f"   Connection error: {e}")
-        return None
+        return None, f"Connection error: {e}"
+
+
+def report_query(future):
+    """Wait for a fetch_query() submitted to a pool and print its error, if any."""
+    results, error = future.result()
+    if error:
+        print(f"   {error}")
+    return results
+
+
+def execute_query(sparql_query, headers):
+    """Execute a SPARQL query."""
+    results, error = fetch_query(sparql_query, headers)
+    if error:
+        print(f"   {error}")
+    return results
 
 
 def search_by_template(template_name):
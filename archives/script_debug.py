@@ -2,8 +2,14 @@
 METW Cards Integration - Debug version
 """
 import json
+import mmap
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CARDS_FILE = os.path.join(PROJECT_ROOT, "data", "cards.json")
 
@@ -12,8 +18,9 @@ print("DEBUG: ANALYZING CARDS.JSON STRUCTURE")
 print("=" * 70)
 
 try:
-    with open(CARDS_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # orjson only takes UTF-8 bytes: open in binary mode
+    with open(CARDS_FILE, 'rb') as f:
+        data = orjson.loads(f.read()) if orjson is not None else json.load(f)
 
     print(f" JSON loaded successfully")
     print(f"File size: {os.path.getsize(CARDS_FILE) / 1024:.1f} KB")
@@ -60,16 +67,20 @@ except json.JSONDecodeError as e:
     print(f" JSON parsing error: {e}")
     print("   The file might be corrupted")
 
-    # Try to read first/last few lines
-    with open(CARDS_FILE, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        print(f"\n First 3 lines:")
-        for i, line in enumerate(lines[:3], 1):
-            print(f"  {i}: {line[:100]}...")
+    # Try to read first/last few lines (mapped: only the first and last 4 KB are read)
+    with open(CARDS_FILE, 'rb') as f:
+        if os.path.getsize(CARDS_FILE) > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                head = mm[:4096].splitlines()[:3]
+                tail = mm[-4096:].splitlines()[-3:]
+
+            print(f"\n First 3 lines:")
+            for i, line in enumerate(head, 1):
+                print(f"  {i}: {line[:100].decode('utf-8', errors='replace')}...")
 
-        print(f"\n Last 3 lines:")
-        for i, line in enumerate(lines[-3:], 1):
-            print(f"  {i}: {line[:100]}...")
+            print(f"\n Last 3 lines:")
+            for i, line in enumerate(tail, 1):
+                print(f"  {i}: {line[:100].decode('utf-8', errors='replace')}...")
 
 except Exception as e:
     print(f" Error: {e}")
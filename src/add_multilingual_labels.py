@@ -2,7 +2,119 @@
 add_multilingual_labels_final_fixed.py
 Version avec tags de langue corrects
 """
-from rdflib import Graph, Literal, Namespace, RDFS, URIRef, RDF
+from rdflib import Graph, Literal, Namespace, RDFS, URIRef, RDF, XSD
+
+# Store Oxigraph (Rust) si oxrdflib est installé : parsing Turtle et index en natif
+try:
+    import oxrdflib  # noqa: F401 - enregistre le store "Oxigraph" et les parseurs "ox-*"
+except ImportError:
+    oxrdflib = None
+
+def load_graph(path):
+    """Charge un fichier Turtle, avec Oxigraph si possible, sinon le parseur rdflib."""
+    if oxrdflib is not None:
+        g = Graph(store="Oxigraph")
+        try:
+            g.parse(path, format="ox-turtle")
+            return g
+        except SyntaxError as e:
+            # Oxigraph refuse les IRI invalides que rdflib accepte
+            print(f" Oxigraph n'a pas pu lire {path} ({e}), parseur rdflib utilisé")
+
+    # Store "Memory" explicite : celui par défaut depuis rdflib 6, plus rapide que l'ancien IOMemory
+    g = Graph(store="Memory")
+    g.parse(path, format="turtle")
+    return g
+
+# Namespace et termes utilisés, résolus une seule fois (pas de __getattr__ du Namespace à chaque triplet)
+SCHEMA1 = Namespace("http://schema.org/")
+LABEL = RDFS.label
+NAME = SCHEMA1.name
+PERSON = SCHEMA1.Person
+
+# Échappement des littéraux N-Triples
+_NT_ESCAPE = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+def write_labels_nt(triples, output):
+    """Écrit des triplets rdfs:label en N-Triples, une ligne par triplet (sans sérialiseur rdflib).
+
+    Le N-Triples est aussi du Turtle valide : le fichier reste lisible en .ttl.
+    """
+    with open(output, "wb", buffering=1 << 20) as f:
+        for s, p, o in triples:
+            if isinstance(o, Literal):
+                lexical = str(o).translate(_NT_ESCAPE)
+                if o.language:
+                    obj = f'"{lexical}"@{o.language}'
+                elif o.datatype and o.datatype != XSD.string:  # xsd:string = littéral simple
+                    obj = f'"{lexical}"^^<{o.datatype}>'
+                else:
+                    obj = f'"{lexical}"'
+            else:
+                obj = o.n3()
+            f.write(f"{s.n3()} {p.n3()} {obj} .\n".encode("utf-8"))
+
+# Traductions améliorées
+TRANSLATIONS = {
+    # Personnages avec traductions réelles
+    "Frodo Baggins": {
+        "fr": "Frodon Sacquet",
+        "es": "Frodo Bolsón",
+        "de": "Frodo Beutlin",
+        "it": "Frodo Baggins",
+        "en": "Frodo Baggins"
+    },
+    "Samwise Gamgee": {
+        "fr": "Samsagace Gamegie",
+        "es": "Samsagaz Gamyi",
+        "de": "Samweis Gamdschie",
+        "it": "Samvise Gamgee",
+        "en": "Samwise Gamgee"
+    },
+    "Meriadoc Brandybuck": {
+        "fr": "Meriadoc Brandebouc",
+        "es": "Meriadoc Brandigamo",
+        "de": "Meriadoc Brandybuter",
+        "it": "Meriadoc Brandibuck",
+        "en": "Meriadoc Brandybuck"
+    },
+    "Peregrin Took": {
+        "fr": "Peregrin Touque",
+        "es": "Peregrin Tuk",
+        "de": "Peregrin Tuk",
+        "it": "Peregrino Tuc",
+        "en": "Peregrin Took"
+    },
+    # Autres personnages (gardent leur nom)
+    "Gandalf": ["en", "fr", "es", "de", "it"],
+    "Aragorn": ["en", "fr", "es", "de", "it"],
+    "Elrond": ["en", "fr", "es", "de", "it"],
+    "Sauron": ["en", "fr", "es", "de", "it"],
+    "Legolas": ["en", "fr", "es", "de", "it"],
+    "Gimli": ["en", "fr", "es", "de", "it"],
+    "Galadriel": ["en", "fr", "es", "de", "it"],
+    "Boromir": ["en", "fr", "es", "de", "it"],
+    "Saruman": ["en", "fr", "es", "de", "it"],
+    "Théoden": ["en", "fr", "es", "de", "it"],
+    "Éowyn": ["en", "fr", "es", "de", "it"],
+    "Faramir": ["en", "fr", "es", "de", "it"],
+    "Gollum": ["en", "fr", "es", "de", "it"],
+    "Treebeard": ["en", "fr", "es", "de", "it"],
+    "Tom Bombadil": ["en", "fr", "es", "de", "it"],
+}
+
+# Table aplatie calculée une fois : nom -> [(langue, label), ...]
+LABELS_BY_NAME = {}
+for _name, _v in TRANSLATIONS.items():
+    if isinstance(_v, dict):
+        # Personnages avec traductions spéciales
+        LABELS_BY_NAME[_name] = list(_v.items())
+    else:
+        # Personnages avec mêmes noms dans toutes langues
+        LABELS_BY_NAME[_name] = [(_lang, _name) for _lang in _v]
+
+# Tous les autres: anglais + français
+DEFAULT_LANGS = ("en", "fr")
 
 def add_multilingual_final():
     print("=" * 60)
@@ -10,102 +122,47 @@ def add_multilingual_final():
     print("=" * 60)
 
     # Charger le graphe COMPLET
-    g = Graph()
-    g.parse("kg/final_knowledge_graph.ttl", format="turtle")
+    g = load_graph("kg/final_knowledge_graph.ttl")
 
-    # Namespace
-    SCHEMA1 = Namespace("http://schema.org/")
+    # Trouver les personnages : tous les noms indexés en une passe, puis une recherche par personne
+    names_of = {}
+    for s, name in g.subject_objects(NAME):
+        name = str(name).strip()
+        if name:
+            names_of.setdefault(s, []).append(name)
 
-    # Trouver les personnages
     persons = []
-    for s, p, o in g.triples((None, RDF.type, SCHEMA1.Person)):
-        for s2, p2, name in g.triples((s, SCHEMA1.name, None)):
-            if str(name).strip():
-                persons.append((str(s), str(name).strip()))
-                break
+    for s in g.subjects(RDF.type, PERSON):
+        names = names_of.get(s)
+        if names:
+            if len(names) > 1:
+                # Plusieurs noms : garder le premier dans l'ordre du fichier
+                names = [n for n in (str(o).strip() for o in g.objects(s, NAME)) if n]
+            persons.append((str(s), names[0]))
 
     print(f" {len(persons)} personnages trouvés")
 
-    # Traductions améliorées
-    translations = {
-        # Personnages avec traductions réelles
-        "Frodo Baggins": {
-            "fr": "Frodon Sacquet",
-            "es": "Frodo Bolsón",
-            "de": "Frodo Beutlin",
-            "it": "Frodo Baggins",
-            "en": "Frodo Baggins"
-        },
-        "Samwise Gamgee": {
-            "fr": "Samsagace Gamegie",
-            "es": "Samsagaz Gamyi",
-            "de": "Samweis Gamdschie",
-            "it": "Samvise Gamgee",
-            "en": "Samwise Gamgee"
-        },
-        "Meriadoc Brandybuck": {
-            "fr": "Meriadoc Brandebouc",
-            "es": "Meriadoc Brandigamo",
-            "de": "Meriadoc Brandybuter",
-            "it": "Meriadoc Brandibuck",
-            "en": "Meriadoc Brandybuck"
-        },
-        "Peregrin Took": {
-            "fr": "Peregrin Touque",
-            "es": "Peregrin Tuk",
-            "de": "Peregrin Tuk",
-            "it": "Peregrino Tuc",
-            "en": "Peregrin Took"
-        },
-        # Autres personnages (gardent leur nom)
-        "Gandalf": ["en", "fr", "es", "de", "it"],
-        "Aragorn": ["en", "fr", "es", "de", "it"],
-        "Elrond": ["en", "fr", "es", "de", "it"],
-        "Sauron": ["en", "fr", "es", "de", "it"],
-        "Legolas": ["en", "fr", "es", "de", "it"],
-        "Gimli": ["en", "fr", "es", "de", "it"],
-        "Galadriel": ["en", "fr", "es", "de", "it"],
-        "Boromir": ["en", "fr", "es", "de", "it"],
-        "Saruman": ["en", "fr", "es", "de", "it"],
-        "Théoden": ["en", "fr", "es", "de", "it"],
-        "Éowyn": ["en", "fr", "es", "de", "it"],
-        "Faramir": ["en", "fr", "es", "de", "it"],
-        "Gollum": ["en", "fr", "es", "de", "it"],
-        "Treebeard": ["en", "fr", "es", "de", "it"],
-        "Tom Bombadil": ["en", "fr", "es", "de", "it"],
-    }
+    # Graphe des labels : labels existants, puis les nouveaux directement (pas de recopie depuis g)
+    # Insertion en bloc avec addN (quadruplets dont le contexte est labels_only)
+    labels_only = Graph(store="Memory")
+    labels_only.addN((s, p, o, labels_only) for s, p, o in g.triples((None, LABEL, None)))
 
     # Ajouter labels
-    added = 0
+    new_labels = []
 
     for uri, name in persons:
         uri_ref = URIRef(uri)
+        pairs = LABELS_BY_NAME.get(name)
+        if pairs is None:
+            pairs = [(lang, name) for lang in DEFAULT_LANGS]
+        for lang, label in pairs:
+            new_labels.append((uri_ref, LABEL, Literal(label, lang=lang), labels_only))
 
-        # Personnages avec traductions spéciales
-        if name in translations and isinstance(translations[name], dict):
-            for lang, label in translations[name].items():
-                g.add((uri_ref, RDFS.label, Literal(label, lang=lang)))
-                added += 1
-
-        # Personnages avec mêmes noms dans toutes langues
-        elif name in translations:
-            for lang in translations[name]:
-                g.add((uri_ref, RDFS.label, Literal(name, lang=lang)))
-                added += 1
-
-        # Tous les autres: anglais + français
-        else:
-            g.add((uri_ref, RDFS.label, Literal(name, lang="en")))
-            g.add((uri_ref, RDFS.label, Literal(name, lang="fr")))
-            added += 2
-
-    # Crée un nouveau graphe avec seulement les labels
-    labels_only = Graph()
-    for s, p, o in g.triples((None, RDFS.label, None)):
-        labels_only.add((s, p, o))
+    labels_only.addN(new_labels)
+    added = len(new_labels)
 
     output = "data/multilingual_labels_only.ttl"
-    labels_only.serialize(output, format="turtle")
+    write_labels_nt(labels_only.triples((None, LABEL, None)), output)
 
 
     # Vérification
@@ -113,13 +170,12 @@ def add_multilingual_final():
     print(f"Personnages: {len(persons)}")
     print(f"Labels ajoutés: {added}")
 
-    # Compter les langues
+    # Compter les langues (un label déjà présent dans le graphe n'est compté qu'une fois)
     print(f"\n* RÉPARTITION PAR LANGUE:")
     lang_count = {}
-    for s, p, o in g.triples((None, RDFS.label, None)):
+    for o in labels_only.objects(None, LABEL):
         if hasattr(o, 'language') and o.language:
-            lang = o.language
-            lang_count[lang] = lang_count.get(lang, 0) + 1
+            lang_count[o.language] = lang_count.get(o.language, 0) + 1
 
     for lang, count in sorted(lang_count.items()):
         print(f"  {lang}: {count} labels")
@@ -131,7 +187,7 @@ def add_multilingual_final():
         for uri, pname in persons:
             if pname == name:
                 print(f"\n{name}:")
-                labels = list(g.objects(URIRef(uri), RDFS.label))
+                labels = list(labels_only.objects(URIRef(uri), LABEL))
                 for label in labels:
                     if hasattr(label, 'language'):
                         print(f"  {label.language}: {label}")
@@ -4,11 +4,24 @@ API MediaWiki pour récupérer les liens Wikipedia depuis Tolkien Gateway
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 from rdflib import Graph, URIRef, Namespace
-import time
 import sys
 
+# Cache disque optionnel des réponses MediaWiki (pip install requests-cache)
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+# orjson (optionnel) : décodage JSON en C, plus rapide que response.json()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 print("=" * 70)
 print("API MEDIAWIKI POUR LES ALIGNEMENTS DBpedia/YAGO")
 print("=" * 70)
@@ -16,6 +29,24 @@ print("=" * 70)
 # Configuration de l'API Tolkien Gateway
 API_URL = "https://tolkiengateway.net/w/api.php"
 
+# Réponses de l'API gardées un jour entre deux exécutions si requests-cache est installé
+# (MW_CACHE_EXPIRE = 0 pour toujours revalider)
+MW_CACHE_FILE = "data/.mw_cache"
+MW_CACHE_EXPIRE = 86400
+
+# Session HTTP partagée : connexions keep-alive réutilisées entre les appels API
+if requests_cache is not None:
+    SESSION = requests_cache.CachedSession(
+        MW_CACHE_FILE, backend="sqlite", allowable_methods=["GET"],
+        expire_after=requests_cache.DO_NOT_CACHE,
+        urls_expire_after={"tolkiengateway.net": MW_CACHE_EXPIRE})
+else:
+    SESSION = requests.Session()
+SESSION.headers["User-Agent"] = "tolkien-kg/1.0"
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10, pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])))
+
 # Namespaces
 TGW = Namespace("http://tolkiengateway.net/resource/")
 DBPEDIA = Namespace("http://dbpedia.org/resource/")
@@ -23,36 +54,54 @@ YAGO = Namespace("http://yago-knowledge.org/resource/")
 OWL = Namespace("http://www.w3.org/2002/07/owl#")
 
 
-def get_external_links_api(page_title):
-    """Utilise l'API MediaWiki pour récupérer les liens externes"""
+def get_external_links_batch(titles):
+    """Récupère les liens externes Wikipedia de plusieurs pages en un seul appel API
 
-    params = {
+    Retourne {titre: [urls]} ; jusqu'à 50 titres par appel.
+    """
+    base_params = {
         "action": "query",
-        "titles": page_title,
+        "titles": "|".join(titles),
         "prop": "extlinks",
         "ellimit": "max",
-        "format": "json"
+        "format": "json",
+        "formatversion": "2"
     }
+    params = base_params
 
+    links_by_title = {title: [] for title in titles}
     try:
-        response = requests.get(API_URL, params=params, timeout=10)
-        data = response.json()
-
-        wikipedia_links = []
-        pages = data.get("query", {}).get("pages", {})
-
-        for page_id, page_info in pages.items():
-            if page_id != "-1" and "extlinks" in page_info:
+        while True:
+            response = SESSION.get(API_URL, params=params, timeout=10)
+            data = orjson.loads(response.content) if orjson is not None else response.json()
+            query = data.get("query", {})
+            # Titres normalisés par l'API -> titre demandé
+            renamed = {n["to"]: n["from"] for n in query.get("normalized", [])}
+
+            for page_info in query.get("pages", []):
+                if page_info.get("missing") or "extlinks" not in page_info:
+                    continue
+                wikipedia_links = links_by_title.setdefault(renamed.get(page_info["title"], page_info["title"]), [])
                 for link in page_info["extlinks"]:
-                    url = link.get("*", "")
-                    # Filtrer les liens Wikipedia
-                    if any(wiki in url.lower() for wiki in ["wikipedia.org", "wiki/"]):
+                    url = link.get("url", "")
+                    # Filtrer les liens Wikipedia (le domaine est toujours en minuscules)
+                    if "wikipedia.org" in url:
                         wikipedia_links.append(url)
 
-        return wikipedia_links
+            # ellimit s'applique à l'ensemble des pages : suite des liens si besoin
+            if "continue" not in data:
+                break
+            params = {**base_params, **data["continue"]}
+
     except Exception as e:
-        print(f" Erreur API pour '{page_title}': {e}")
-        return []
+        print(f" Erreur API pour '{'|'.join(titles)}': {e}")
+
+    return links_by_title
+
+
+def get_external_links_api(page_title):
+    """Utilise l'API MediaWiki pour récupérer les liens externes"""
+    return get_external_links_batch([page_title]).get(page_title, [])
 
 
 def extract_wikipedia_title(url):
@@ -75,36 +124,32 @@ def main():
 
     g = Graph()
     alignments_created = 0
+    wikipedia_found = 0
 
     print("\n CONNEXION À L'API MEDIAWIKI DE TOLKIEN GATEWAY...")
     print(f"URL API: {API_URL}")
     print(f"Paramètre: prop=extlinks (récupère les liens externes)")
     print()
 
+    # 1. Un seul appel API MediaWiki pour tous les personnages
+    print(f"    Appel API: action=query, titles={'|'.join(test_characters)}, prop=extlinks")
+    links_by_character = get_external_links_batch(test_characters)
+
     for character in test_characters:
         print(f"\n Analyse de: {character}")
 
-        # 1. Appel API MediaWiki
-        print(f"    Appel API: action=query, titles={character}, prop=extlinks")
-        external_links = get_external_links_api(character)
-
-        if not external_links:
-            print(f"   Warning: Aucun lien externe trouvé")
-            continue
-
-        print(f"    {len(external_links)} lien(s) externe(s) trouvé(s)")
-
-        # 2. Filtrer les liens Wikipedia
-        wikipedia_links = []
-        for link in external_links:
-            if "wikipedia.org" in link.lower():
-                wikipedia_links.append(link)
-                print(f"   Wikipedia: {link}")
+        # 2. Liens Wikipedia (déjà filtrés par l'appel API)
+        wikipedia_links = links_by_character.get(character, [])
 
         if not wikipedia_links:
             print(f"    Aucun lien Wikipedia trouvé")
             continue
 
+        print(f"    {len(wikipedia_links)} lien(s) Wikipedia trouvé(s)")
+        for link in wikipedia_links:
+            print(f"   Wikipedia: {link}")
+
+        wikipedia_found += 1
 
         wiki_url = wikipedia_links[0]
         wiki_title = extract_wikipedia_title(wiki_url)
@@ -128,9 +173,6 @@ def main():
         else:
             print(f"    Impossible d'extraire le titre Wikipedia")
 
-        # Pause pour respecter l'API
-        time.sleep(1)
-
     # Sauvegarder les résultats
     if alignments_created > 0:
         output_file = "data/api_alignments.ttl"
@@ -140,7 +182,7 @@ def main():
         print(" RÉSULTATS DE L'API MEDIAWIKI")
         print("=" * 70)
         print(f"Personnages analysés: {len(test_characters)}")
-        print(f"Liens Wikipedia trouvés: {sum(1 for c in test_characters if get_external_links_api(c))}")
+        print(f"Liens Wikipedia trouvés: {wikipedia_found}")
         print(f"Alignements créés: {alignments_created} triplets owl:sameAs")
         print(f"Fichier généré: {output_file}")
 
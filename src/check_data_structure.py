@@ -3,9 +3,19 @@ check_data_structure.py - Vérifie quelles propriétés existent vraiment
 """
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson (optionnel) : décodage JSON en C, plus rapide que response.json()
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 SPARQL_ENDPOINT = "http://localhost:3030/tolkienKG/sparql"
 
+# Connexions keep-alive partagées par toutes les requêtes
+SESSION = requests.Session()
+
 def check_existing_properties():
     """Vérifie quelles propriétés existent dans vos données"""
     
@@ -48,19 +58,28 @@ def check_existing_properties():
     print("VÉRIFICATION DE LA STRUCTURE DES DONNÉES")
     print("=" * 70)
     
-    for name, query in queries.items():
+    # Requêtes indépendantes : envoyées en parallèle, résultats affichés dans l'ordre
+    executor = ThreadPoolExecutor(max_workers=len(queries))
+    futures = {
+        name: executor.submit(
+            SESSION.get,
+            SPARQL_ENDPOINT,
+            params={'query': query, 'format': 'json'},
+            timeout=10
+        )
+        for name, query in queries.items()
+    }
+    executor.shutdown(wait=False)
+
+    for name, future in futures.items():
         print(f"\n{name}")
         print("-" * 50)
         
         try:
-            response = requests.get(
-                SPARQL_ENDPOINT,
-                params={'query': query, 'format': 'json'},
-                timeout=10
-            )
+            response = future.result()
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content) if orjson is not None else response.json()
                 bindings = data.get('results', {}).get('bindings', [])
                 
                 if bindings:
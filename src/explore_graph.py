@@ -1,8 +1,18 @@
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson (optionnel) : décodage JSON en C, plus rapide que response.json()
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 endpoint = "http://localhost:3030/tolkienKG/query"
 
+# Connexions keep-alive partagées par toutes les requêtes
+SESSION = requests.Session()
+
 
 def explore_graph():
     print(" EXPLORATION DU GRAPHE TOLKIEN")
@@ -47,14 +57,20 @@ def explore_graph():
         """
     }
 
-    for name, query in queries.items():
+    # Requêtes indépendantes : envoyées en parallèle, résultats affichés dans l'ordre
+    executor = ThreadPoolExecutor(max_workers=len(queries))
+    futures = {name: executor.submit(SESSION.get, endpoint, params={'query': query}, timeout=10)
+               for name, query in queries.items()}
+    executor.shutdown(wait=False)
+
+    for name, future in futures.items():
         print(f"\n{name}")
         print("-" * 40)
 
         try:
-            response = requests.get(endpoint, params={'query': query}, timeout=10)
+            response = future.result()
             if response.status_code == 200:
-                results = response.json()
+                results = orjson.loads(response.content) if orjson is not None else response.json()
                 for binding in results['results']['bindings']:
                     # Afficher proprement
                     row = []
@@ -90,9 +106,9 @@ def find_entities_with_most_data():
     """
 
     try:
-        response = requests.get(endpoint, params={'query': query}, timeout=10)
+        response = SESSION.get(endpoint, params={'query': query}, timeout=10)
         if response.status_code == 200:
-            results = response.json()
+            results = orjson.loads(response.content) if orjson is not None else response.json()
             print("Entité | Nombre de propriétés")
             print("-" * 40)
             for binding in results['results']['bindings']:
@@ -1,9 +1,27 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
 import os
+import socket
 import time
-from urllib.parse import quote
-from rdflib import Graph, URIRef, Literal, Namespace, RDF, RDFS, XSD
+import threading
+import zlib
+from collections import Counter
+from urllib.parse import quote, urlsplit
+from rdflib import URIRef, Literal, Namespace, RDF, XSD
+
+# Optional on-disk cache of the MediaWiki responses (pip install requests-cache)
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+# Optional faster JSON decoding of the API responses
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # ---------------------------
 # Configuration
@@ -15,8 +33,33 @@ DCTERMS = Namespace("http://purl.org/dc/terms/")
 FOAF = Namespace("http://xmlns.com/foaf/0.1/")
 
 FUSEKI_ENDPOINT = "http://localhost:3030/tolkienKG"
+# Uploads are gzipped while they stream (the triples repeat the same IRIs)
+FUSEKI_GZIP_LEVEL = 6
 API_URL = "https://tolkiengateway.net/w/api.php"
 
+# Wiki responses cached for a day across runs when requests-cache is installed
+# (set MW_CACHE_EXPIRE = 0 to always revalidate); other URLs are never cached
+MW_CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", ".mw_cache")
+MW_CACHE_EXPIRE = 86400
+
+# Shared HTTP session: keep-alive connections are reused across all API calls
+if requests_cache is not None:
+    SESSION = requests_cache.CachedSession(
+        MW_CACHE_FILE, backend="sqlite", allowable_methods=["GET"],
+        expire_after=requests_cache.DO_NOT_CACHE,
+        urls_expire_after={"tolkiengateway.net": MW_CACHE_EXPIRE})
+else:
+    SESSION = requests.Session()
+SESSION.headers["User-Agent"] = "tolkien-kg/1.0"
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10, pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])))
+
+# API requests rate limited to ~10 requests/s
+REQUESTS_PER_SECOND = 10
+_rate_lock = threading.Lock()
+_next_request_time = 0.0
+
 # Schema.org property mappings for character infoboxes
 PROPERTY_MAPPINGS = {
     "name": SCHEMA.name,
@@ -44,6 +87,14 @@ PROPERTY_MAPPINGS = {
 }
 
 
+# Patterns compiled once (used for every infobox value)
+_WIKILINK_RE = re.compile(r"\[\[([^|\]]+)(?:\|([^\]]+))?\]\]")  # [[X]] or [[X|Y]]
+# Infobox lines "| field = value": one scan over the wikitext instead of split("\n")
+_INFOBOX_FIELD_RE = re.compile(r"^[^\S\n]*\|([^=\n]*)=([^\n]*)", re.MULTILINE)
+# Runs of separators, punctuation and underscores, each collapsed to a single "_"
+_URI_UNSAFE_RE = re.compile(r"[ :()\[\]{}|\\/#,;.!_]+")
+
+
 # ---------------------------
 # Enhanced helper functions
 # ---------------------------
@@ -61,15 +112,8 @@ def safe_uri_name(name):
     # Remove quotes
     safe = safe.replace('"', '').replace("'", "")
 
-    # List of characters to replace with underscores
-    chars_to_replace = [" ", ":", "(", ")", "[", "]", "{", "}",
-                        "|", "\\", "/", "#", ",", ";", ".", "!"]
-
-    for char in chars_to_replace:
-        safe = safe.replace(char, "_")
-
-    # Replace multiple underscore sequences with a single one
-    safe = re.sub(r"_+", "_", safe)
+    # Replace special characters with underscores and collapse the runs, in one pass
+    safe = _URI_UNSAFE_RE.sub("_", safe)
 
     # Remove underscores from beginning and end
     safe = safe.strip("_")
@@ -96,7 +140,7 @@ def parse_wiki_value(value):
     - Otherwise, return a single Literal.
     """
     # Find all links [[X]] or [[X|Y]]
-    links = re.findall(r"\[\[([^\|\]]+)(?:\|([^\]]+))?\]\]", value)
+    links = _WIKILINK_RE.findall(value)
     if links:
         uris = []
         for link in links:
@@ -148,121 +192,117 @@ def clean_wikitext_value(value):
     return value.strip()
 
 
-def get_characters_from_category(category, limit=None):
-    """
-    Retrieve characters from a Wikipedia category.
-    """
-    members = []
-    cmcontinue = ""
-    count = 0
+def wait_for_rate_limit():
+    """Block until the next API request slot is free (shared by all threads)."""
+    global _next_request_time
 
-    print(f"Retrieving characters from category: {category}")
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_time - now
+        _next_request_time = max(now, _next_request_time) + 1.0 / REQUESTS_PER_SECOND
 
-    while True:
-        params = {
-            "action": "query",
-            "list": "categorymembers",
-            "cmtitle": f"Category:{category}",
-            "cmlimit": "max",
-            "format": "json",
-        }
-        if cmcontinue:
-            params["cmcontinue"] = cmcontinue
+    if wait > 0:
+        time.sleep(wait)
 
-        try:
-            r = requests.get(API_URL, params=params, timeout=15).json()
-        except Exception as e:
-            print(f"Error during retrieval: {e}")
-            break
 
-        if "query" in r:
-            batch = r["query"]["categorymembers"]
-            for m in batch:
-                members.append(m["title"])
-                count += 1
-                if limit and count >= limit:
-                    break
-
-        if limit and count >= limit:
-            break
-
-        if "continue" in r:
-            cmcontinue = r["continue"]["cmcontinue"]
-            time.sleep(0.5)
-        else:
-            break
-
-    print(f"  {len(members)} characters found")
-    return members
-
-
-def get_infobox(title):
+def get_category_pages(category, limit=None):
     """
-    Retrieve infobox content from a Wikipedia page.
-    Robust version with better error handling.
+    Retrieve the pages of a category together with their wikitext.
+    One generator=categorymembers query lists the members and returns their
+    content, instead of a listing pass followed by one fetch per page.
+    Returns {title: wikitext} in the order the API returns the pages.
     """
-    params = {
+    pages = {}
+    base_params = {
         "action": "query",
+        "generator": "categorymembers",
+        "gcmtitle": f"Category:{category}",
+        "gcmlimit": "max",
         "prop": "revisions",
         "rvprop": "content",
-        "titles": title,
-        "format": "json"
+        "rvslots": "main",
+        "format": "json",
+        "formatversion": "2",
     }
+    params = base_params
 
-    try:
-        response = requests.get(API_URL, params=params, timeout=15)
-
-        if response.status_code != 200:
-            return ""
+    print(f"Retrieving characters from category: {category}")
 
+    while True:
         try:
-            data = response.json()
-        except ValueError:
-            return ""
-
-        if "query" not in data:
-            return ""
-
-        pages = data.get("query", {}).get("pages", {})
-        if not pages:
-            return ""
-
-        page = next(iter(pages.values()))
-
-        if page.get("missing") is not None or page.get("pageid", 0) <= 0:
-            return ""
-
-        revisions = page.get("revisions", [])
-        if revisions:
-            return revisions[0].get("*", "")
+            wait_for_rate_limit()
+            response = SESSION.get(API_URL, params=params, timeout=30)
+            r = orjson.loads(response.content) if orjson is not None else response.json()
+        except Exception as e:
+            print(f"Error during retrieval: {e}")
+            break
 
-        return ""
+        for page in r.get("query", {}).get("pages", []):
+            title = page["title"]
+            if title not in pages:
+                if limit and len(pages) >= limit:
+                    continue
+                pages[title] = ""
+            # Content is capped per response: a page may come back without
+            # revisions, they are then sent in a following (rvcontinue) response
+            revisions = page.get("revisions")
+            if revisions:
+                pages[title] = revisions[0].get("slots", {}).get("main", {}).get("content", "")
+
+        if "continue" not in r:
+            break
+        # With a limit, stop once the listed pages have their content
+        if limit and len(pages) >= limit and "gcmcontinue" in r["continue"] and "rvcontinue" not in r["continue"]:
+            break
+        # Continuation values replace the previous ones (they are not cumulative)
+        params = {**base_params, **r["continue"]}
 
-    except requests.exceptions.Timeout:
-        return ""
-    except requests.exceptions.ConnectionError:
-        return ""
-    except Exception:
-        return ""
+    print(f"  {len(pages)} characters found")
+    return pages
 
 
-def wait_for_fuseki(max_retries=10):
+def wait_for_fuseki(max_retries=16):
     """
     Wait for Fuseki to be available.
+    Probes the TCP port (no HTTP request), retrying after 10 ms, 20 ms, 40 ms...
+    up to 2 s between attempts (about 18 s in total by default).
     """
+    url = urlsplit(FUSEKI_ENDPOINT)
+    address = (url.hostname, url.port or 80)
     for i in range(max_retries):
         try:
-            response = requests.get("http://localhost:3030/", timeout=2)
-            if response.status_code == 200:
+            with socket.create_connection(address, timeout=0.5):
                 print("Fuseki is accessible")
                 return True
-        except:
+        except OSError:
             if i < max_retries - 1:
                 print(f"  Attempt {i + 1}/{max_retries} - Waiting for Fuseki...")
-                time.sleep(2)
+                time.sleep(min(0.01 * 2 ** i, 2.0))
     return False
 
 
+def post_to_fuseki(path, chunk_size=128 * 1024):
+    """
+    Send an N-Triples file to Fuseki, gzip-compressed chunk by chunk
+    (the file is never loaded whole in memory).
+    """
+    def gzipped_chunks():
+        compressor = zlib.compressobj(FUSEKI_GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip format
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+        yield compressor.flush()
+
+    return SESSION.post(
+        FUSEKI_ENDPOINT + "/data",
+        data=gzipped_chunks(),
+        headers={"Content-Type": "application/n-triples", "Content-Encoding": "gzip"},
+        timeout=60
+    )
+
+
 def add_to_graph_with_schema(graph, name, properties):
     """
     Add character data to RDF graph with schema.org alignment.
@@ -355,26 +395,100 @@ def add_to_graph_with_schema(graph, name, properties):
         return False
 
 
+# ---------------------------
+# Streaming output
+# ---------------------------
+_NT_ESCAPE = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def nt_term(term):
+    """Format an rdflib term for N-Triples output."""
+    if isinstance(term, Literal):
+        lexical = str(term).translate(_NT_ESCAPE)
+        if term.language:
+            return f'"{lexical}"@{term.language}'
+        if term.datatype:
+            return f'"{lexical}"^^<{term.datatype}>'
+        return f'"{lexical}"'
+    return term.n3()
+
+
+class TripleWriter:
+    """
+    Write triples straight to an N-Triples file instead of an in-memory Graph.
+    Exposes add() like rdflib.Graph. Duplicates (a link repeated in several fields,
+    two fields with the same value) are written once: the current subject's lines
+    are remembered, and for the subjects passed to share_subjects() (names that
+    reduce to the same URI) every line written so far.
+    Counts what the final statistics need (triples, persons, predicates).
+    """
+
+    def __init__(self, filename, buffer_size=1 << 20):
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self._file = open(filename, "wb", buffering=buffer_size)
+        self._subject = None
+        self._subject_lines = set()
+        self._shared = frozenset()
+        self._shared_lines = set()
+        self._persons = set()
+        self.count = 0
+        self.predicate_counts = Counter()
+
+    def share_subjects(self, subjects):
+        """Drop repeated triples of these subjects across the whole run."""
+        self._shared = frozenset(subjects)
+
+    def add(self, triple):
+        s, p, o = triple
+        if s != self._subject:
+            self._subject = s
+            self._subject_lines.clear()
+
+        line = "{} {} {} .\n".format(*map(nt_term, triple))
+        seen = self._shared_lines if s in self._shared else self._subject_lines
+        if line in seen:
+            return
+        seen.add(line)
+        self._file.write(line.encode("utf-8"))
+        self.count += 1
+        self.predicate_counts[p] += 1
+        if p == RDF.type and o == SCHEMA.Person:
+            self._persons.add(s)
+
+    @property
+    def person_count(self):
+        return len(self._persons)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __len__(self):
+        return self.count
+
+
 # ---------------------------
 # Main Program
 # ---------------------------
 def main():
-    # Initialize RDF graph with bindings
-    g = Graph()
-    g.bind("schema", SCHEMA)
-    g.bind("tgw", TGW)
-    g.bind("tgwo", TGWO)
-    g.bind("dcterms", DCTERMS)
-    g.bind("foaf", FOAF)
-    g.bind("rdfs", RDFS)
-    g.bind("xsd", XSD)
+    PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    OUTPUT_FILE = os.path.join(PROJECT_ROOT, "data", "all_characters_schema.ttl")
+
+    # Triples are streamed to disk as they are produced (no in-memory graph).
+    # N-Triples is also valid Turtle: the .ttl file stays readable by the loaders
+    g = TripleWriter(OUTPUT_FILE)
 
     print("=" * 50)
     print("Starting RDF graph generation - ALL CHARACTERS WITH SCHEMA.ORG USED")
     print("=" * 50)
 
-    # Retrieve ALL characters
-    characters = get_characters_from_category("Third_Age_characters")
+    # Retrieve ALL characters, with their wikitext
+    infoboxes = get_category_pages("Third_Age_characters")
+    characters = list(infoboxes)
+
+    # Different names can reduce to the same URI: their triples are deduplicated across pages
+    uri_counts = Counter(safe_uri_name(name) for name in characters)
+    g.share_subjects(URIRef(TGW[name]) for name, count in uri_counts.items() if count > 1)
 
     # Counters for tracking
     total_characters = len(characters)
@@ -396,26 +510,21 @@ def main():
 
         # Retrieve and parse infobox
         try:
-            infobox_text = get_infobox(name)
+            infobox_text = infoboxes.get(name, "")
             if not infobox_text:
                 characters_without_infobox += 1
                 continue
 
             # Parse infobox properties
             properties = {}
-            for line in infobox_text.split("\n"):
-                line = line.strip()
-                if line.startswith("|"):
-                    parts = line[1:].split("=", 1)
-                    if len(parts) == 2:
-                        field, value = parts
-                        field = field.strip()
-                        value = value.strip()
+            for m in _INFOBOX_FIELD_RE.finditer(infobox_text):
+                field = m.group(1).strip()
+                value = m.group(2).strip()
 
-                        if not field or not value:
-                            continue
+                if not field or not value:
+                    continue
 
-                        properties[field] = value
+                properties[field] = value
 
             if properties:
                 if add_to_graph_with_schema(g, name, properties):
@@ -430,9 +539,6 @@ def main():
             characters_with_errors += 1
             print(f"  [{index}] Error on {name}: {str(e)[:50]}...")
 
-        # Small pause to avoid overloading the API
-        time.sleep(0.1)
-
     # ---------------------------
     # Serialization
     # ---------------------------
@@ -442,28 +548,13 @@ def main():
     print("RDF GRAPH SERIALIZATION")
     print("=" * 50)
 
-    PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    OUTPUT_FILE = os.path.join(PROJECT_ROOT, "data", "all_characters_schema.ttl")
-
-    # Create data folder if it doesn't exist
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    g.close()
+    print(f" RDF generated with schema.org: {OUTPUT_FILE}")
+    print(f"   File size: {os.path.getsize(OUTPUT_FILE) / 1024:.1f} KB")
+    print(f"   Total triples: {len(g)}")
 
-    # Serialize RDF graph
-    try:
-        g.serialize(OUTPUT_FILE, format="turtle")
-        print(f" RDF generated with schema.org: {OUTPUT_FILE}")
-        print(f"   File size: {os.path.getsize(OUTPUT_FILE) / 1024:.1f} KB")
-        print(f"   Total triples: {len(g)}")
-
-        # Count schema:Person entities
-        person_count = len(list(g.subjects(RDF.type, SCHEMA.Person)))
-        print(f"   schema:Person entities: {person_count}")
-
-    except Exception as e:
-        print(f"Error during serialization: {e}")
-        backup_file = OUTPUT_FILE.replace(".ttl", ".nt")
-        g.serialize(backup_file, format="nt")
-        print(f"NTriples backup: {backup_file}")
+    # Count schema:Person entities
+    print(f"   schema:Person entities: {g.person_count}")
 
     print("\n" + "=" * 50)
     print("FINAL SUMMARY")
@@ -479,13 +570,13 @@ def main():
     print("SCHEMA.ORG STATISTICS")
     print("=" * 50)
 
-    # Count most used schema.org properties
-    from collections import Counter
+    # Count most used schema.org properties: counted per predicate while writing,
+    # the string tests are done once per distinct predicate (not once per triple)
     props = Counter()
-    for s, p, o in g:
+    for p, count in g.predicate_counts.items():
         if str(p).startswith("http://schema.org/"):
             prop_name = str(p).split("/")[-1]
-            props[prop_name] += 1
+            props[prop_name] += count
 
     print("Top schema.org properties:")
     for prop, count in props.most_common(10):
@@ -499,17 +590,11 @@ def main():
     # if os.path.exists(OUTPUT_FILE):
     #     if wait_for_fuseki():
     #         try:
-    #             with open(OUTPUT_FILE, "rb") as f:
-    #                 r = requests.post(
-    #                     FUSEKI_ENDPOINT + "/data",
-    #                     data=f,
-    #                     headers={"Content-Type": "text/turtle"},
-    #                     timeout=60
-    #                 )
-    #                 if r.status_code in [200, 201, 204]:
-    #                     print("RDF successfully added to Fuseki!")
-    #                 else:
-    #                     print(f"Fuseki error: {r.status_code}")
+    #             r = post_to_fuseki(OUTPUT_FILE)
+    #             if r.status_code in [200, 201, 204]:
+    #                 print("RDF successfully added to Fuseki!")
+    #             else:
+    #                 print(f"Fuseki error: {r.status_code}")
     #         except Exception as e:
     #             print(f"Error during sending: {e}")
     #     else:
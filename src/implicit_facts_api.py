@@ -1,9 +1,29 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
+import threading
+import time
+from urllib.parse import urlencode
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from waitress import serve  # multi-threaded WSGI server, used when installed
+except ImportError:
+    serve = None
 
 app = Flask(__name__)
 SPARQL_ENDPOINT = "http://localhost:3030/tolkienKG/sparql"
 
+# Keep-alive connections to Fuseki shared by all request threads
+SERVER_THREADS = 16
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+# The graph only changes when Fuseki is reloaded: keep query results a few minutes
+CACHE_TTL = 300
+STREAM_CHUNK_SIZE = 65536
+_results_cache = {}  # query_name -> (expires_at, JSON body)
+_results_lock = threading.Lock()
+
 IMPLICIT_QUERIES = {
     "family_relationships": """
         PREFIX schema: <http://schema.org/>
@@ -93,6 +113,47 @@ IMPLICIT_QUERIES = {
     """
 }
 
+# Form-encoded POST bodies, encoded once at import
+IMPLICIT_QUERIES_ENC = {name: urlencode({"query": query}).encode("ascii")
+                        for name, query in IMPLICIT_QUERIES.items()}
+SPARQL_POST_HEADERS = {
+    'Content-Type': 'application/x-www-form-urlencoded',
+    'Accept': 'application/sparql-results+json'
+}
+
+def run_implicit_query(query_name):
+    '''Returns (iterable of JSON body chunks, status) of a query, from the cache when fresh'''
+    with _results_lock:
+        cached = _results_cache.get(query_name)
+    if cached and cached[0] > time.monotonic():
+        return [cached[1]], 200
+
+    response = SESSION.post(
+        SPARQL_ENDPOINT,
+        data=IMPLICIT_QUERIES_ENC[query_name],
+        headers=SPARQL_POST_HEADERS,
+        timeout=10,
+        stream=True
+    )
+    if response.status_code != 200:
+        response.close()
+        return None, response.status_code
+
+    return _stream_and_cache(query_name, response), 200
+
+def _stream_and_cache(query_name, response):
+    '''Forwards Fuseki's body chunk by chunk, then caches it once fully sent'''
+    chunks = []
+    try:
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            chunks.append(chunk)
+            yield chunk
+    finally:
+        response.close()
+
+    with _results_lock:
+        _results_cache[query_name] = (time.monotonic() + CACHE_TTL, b"".join(chunks))
+
 @app.route('/api/implicit/<query_name>')
 def get_implicit_facts(query_name):
     '''Returns implicit facts from the knowledge graph'''
@@ -101,17 +162,13 @@ def get_implicit_facts(query_name):
         return jsonify({"error": "Query not found"}), 404
     
     try:
-        response = requests.get(
-            SPARQL_ENDPOINT,
-            params={'query': IMPLICIT_QUERIES[query_name]},
-            headers={'Accept': 'application/sparql-results+json'},
-            timeout=10
-        )
+        chunks, status = run_implicit_query(query_name)
         
-        if response.status_code == 200:
-            return jsonify(response.json())
+        if status == 200:
+            # Fuseki's JSON is streamed as is (no decode / re-encode)
+            return Response(stream_with_context(chunks), content_type="application/sparql-results+json")
         else:
-            return jsonify({"error": "SPARQL query failed", "status": response.status_code}), 500
+            return jsonify({"error": "SPARQL query failed", "status": status}), 500
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -172,4 +229,8 @@ if __name__ == '__main__':
     print("\nHome page: http://localhost:5001")
     print("=" * 60)
     
-    app.run(port=5001, debug=False)
\ No newline at end of file
+    # In production: gunicorn -k gthread --threads 16 -b :5001 implicit_facts_api:app
+    if serve is not None:
+        serve(app, port=5001, threads=SERVER_THREADS)
+    else:
+        app.run(port=5001, debug=False, threaded=True)
\ No newline at end of file